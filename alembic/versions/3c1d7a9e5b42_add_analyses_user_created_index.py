@@ -0,0 +1,28 @@
+"""add analyses user created index
+
+Revision ID: 3c1d7a9e5b42
+Revises: 9019b8d585f6
+Create Date: 2026-10-15 10:12:40.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d7a9e5b42'
+down_revision: Union[str, None] = '9019b8d585f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_analyses_user_id_created_at', 'analyses', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_analyses_user_id_created_at', table_name='analyses')
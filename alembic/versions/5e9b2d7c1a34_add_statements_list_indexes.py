@@ -0,0 +1,43 @@
+"""add statements list indexes
+
+Revision ID: 5e9b2d7c1a34
+Revises: d41a6c3f9e08
+Create Date: 2026-10-15 12:41:07.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9b2d7c1a34'
+down_revision: Union[str, None] = 'd41a6c3f9e08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = ['original_filename', 'bank_name', 'notes']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_statements_user_id_created_at', 'statements', ['user_id', 'created_at'], unique=False)
+    # Trigram indexes let the leading-wildcard ILIKE searches use an index scan
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in TRGM_COLUMNS:
+        op.create_index(
+            f'ix_statements_{column}_trgm',
+            'statements',
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in TRGM_COLUMNS:
+        op.drop_index(f'ix_statements_{column}_trgm', table_name='statements')
+    op.drop_index('ix_statements_user_id_created_at', table_name='statements')
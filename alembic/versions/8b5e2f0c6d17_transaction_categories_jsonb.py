@@ -0,0 +1,43 @@
+"""transaction categories jsonb
+
+Revision ID: 8b5e2f0c6d17
+Revises: 3c1d7a9e5b42
+Create Date: 2026-10-15 10:41:07.552918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b5e2f0c6d17'
+down_revision: Union[str, None] = '3c1d7a9e5b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'analyses',
+        'transaction_categories',
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using='transaction_categories::jsonb'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'analyses',
+        'transaction_categories',
+        existing_type=postgresql.JSONB(),
+        type_=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using='transaction_categories::json'
+    )
@@ -0,0 +1,37 @@
+"""add statements content sha256
+
+Revision ID: a7c3e1f59d20
+Revises: 5e9b2d7c1a34
+Create Date: 2026-10-15 13:20:44.581362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e1f59d20'
+down_revision: Union[str, None] = '5e9b2d7c1a34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('statements', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    # Soft-deleted statements are left out so the same file can be uploaded again
+    op.create_index(
+        'uq_statements_user_id_content_sha256',
+        'statements',
+        ['user_id', 'content_sha256'],
+        unique=True,
+        postgresql_where=sa.text('is_active')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_statements_user_id_content_sha256', table_name='statements')
+    op.drop_column('statements', 'content_sha256')
@@ -0,0 +1,31 @@
+"""add uploading statement status
+
+Revision ID: c2f8a4d16b59
+Revises: a7c3e1f59d20
+Create Date: 2026-10-15 13:52:10.264817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f8a4d16b59'
+down_revision: Union[str, None] = 'a7c3e1f59d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A new enum value cannot be used by the transaction that adds it
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE statementstatus ADD VALUE IF NOT EXISTS 'UPLOADING' BEFORE 'UPLOADED'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop an enum value; retire any rows still using it instead
+    op.execute("UPDATE statements SET status = 'FAILED', is_active = false WHERE status = 'UPLOADING'")
@@ -0,0 +1,68 @@
+"""analysis results native jsonb
+
+Revision ID: d41a6c3f9e08
+Revises: 8b5e2f0c6d17
+Create Date: 2026-10-15 11:58:23.907114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a6c3f9e08'
+down_revision: Union[str, None] = '8b5e2f0c6d17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_COLUMNS = [
+    'spending_patterns',
+    'income_analysis',
+    'anomalies',
+    'insights',
+    'recommendations',
+    'risk_assessment',
+    'transactions_data',
+    'excel_data_summary',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows written so far hold a JSON-encoded string; unwrap it while converting
+    for column in JSON_COLUMNS:
+        op.alter_column(
+            'analyses',
+            column,
+            existing_type=sa.JSON(),
+            type_=postgresql.JSONB(),
+            existing_nullable=True,
+            postgresql_using=(
+                f"CASE WHEN json_typeof({column}) = 'string' "
+                f"THEN ({column} #>> '{{}}')::jsonb ELSE {column}::jsonb END"
+            )
+        )
+    op.execute(
+        "UPDATE analyses SET transaction_categories = (transaction_categories #>> '{}')::jsonb "
+        "WHERE jsonb_typeof(transaction_categories) = 'string'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "UPDATE analyses SET transaction_categories = to_jsonb(transaction_categories::text) "
+        "WHERE transaction_categories IS NOT NULL"
+    )
+    for column in JSON_COLUMNS:
+        op.alter_column(
+            'analyses',
+            column,
+            existing_type=postgresql.JSONB(),
+            type_=sa.JSON(),
+            existing_nullable=True,
+            postgresql_using=f"CASE WHEN {column} IS NULL THEN NULL ELSE to_json({column}::text) END"
+        )
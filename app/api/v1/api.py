@@ -1,7 +1,7 @@
 """API v1 router configuration"""
 
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, statements, analyses, health, exports
+from app.api.v1.endpoints import auth, users, statements, analyses, health, exports, webhooks
 
 api_router = APIRouter()
 
@@ -11,4 +11,5 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(statements.router, prefix="/statements", tags=["statements"])
 api_router.include_router(analyses.router, prefix="/analyses", tags=["analyses"])
 api_router.include_router(health.router, prefix="/health", tags=["health"])
-api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
\ No newline at end of file
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
+api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
\ No newline at end of file
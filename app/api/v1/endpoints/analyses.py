@@ -1,8 +1,8 @@
 """Financial analysis endpoints"""
-import json
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import get_db
 from app.api.deps import get_current_active_user
 from app.schemas.analysis import AnalysisResponse, AnalysisListParams, AnalysisStats
@@ -17,7 +17,7 @@ router = APIRouter()
 logger = get_logger(__name__)
 
 
-@router.post("/{statement_id}/analyze")
+@router.post("/{statement_id}/analyze", status_code=status.HTTP_202_ACCEPTED)
 def create_analysis(
     statement_id: int,
     analysis_type: str = "comprehensive",
@@ -52,7 +52,8 @@ def create_analysis(
             "message": "Analysis started",
             "task_id": task.id,
             "statement_id": statement_id,
-            "status": "queued"
+            "status": "queued",
+            "status_url": f"{settings.API_V1_STR}/analyses/task/{task.id}/status"
         }
         
     except HTTPException:
@@ -144,28 +145,18 @@ def get_analyses(
                 "total_expenses": analysis.total_expenses,
                 "net_cash_flow": analysis.net_cash_flow,
                 "financial_health_score": analysis.financial_health_score,
+                "transaction_categories": analysis.transaction_categories,
+                "spending_patterns": analysis.spending_patterns,
+                "anomalies": analysis.anomalies,
+                "insights": analysis.insights,
+                "recommendations": analysis.recommendations,
+                "risk_assessment": analysis.risk_assessment,
                 "summary_text": analysis.summary_text,
                 "detailed_analysis": analysis.detailed_analysis,
                 "created_at": analysis.created_at,
                 "updated_at": analysis.updated_at
             }
-            
 
-            try:
-                if analysis.transaction_categories:
-                    response_data["transaction_categories"] = json.loads(analysis.transaction_categories)
-                if analysis.spending_patterns:
-                    response_data["spending_patterns"] = json.loads(analysis.spending_patterns)
-                if analysis.anomalies:
-                    response_data["anomalies"] = json.loads(analysis.anomalies)
-                if analysis.insights:
-                    response_data["insights"] = json.loads(analysis.insights)
-                if analysis.recommendations:
-                    response_data["recommendations"] = json.loads(analysis.recommendations)
-                if analysis.risk_assessment:
-                    response_data["risk_assessment"] = json.loads(analysis.risk_assessment)
-            except json.JSONDecodeError:
-                pass  # Keep as None if JSON parsing fails
             
             analysis_responses.append(AnalysisResponse(**response_data))
         print(analysis_responses)
@@ -202,8 +193,6 @@ def get_analysis(
             )
         
         # Convert to response format (similar to get_analyses)
-        import json
-        
         response_data = {
             "id": analysis.id,
             "user_id": analysis.user_id,
@@ -215,29 +204,18 @@ def get_analysis(
             "total_expenses": analysis.total_expenses,
             "net_cash_flow": analysis.net_cash_flow,
             "financial_health_score": analysis.financial_health_score,
+            "transaction_categories": analysis.transaction_categories,
+            "spending_patterns": analysis.spending_patterns,
+            "anomalies": analysis.anomalies,
+            "insights": analysis.insights,
+            "recommendations": analysis.recommendations,
+            "risk_assessment": analysis.risk_assessment,
             "summary_text": analysis.summary_text,
             "detailed_analysis": analysis.detailed_analysis,
             "created_at": analysis.created_at,
             "updated_at": analysis.updated_at
         }
         
-        # Parse JSON fields
-        try:
-            if analysis.transaction_categories:
-                response_data["transaction_categories"] = json.loads(analysis.transaction_categories)
-            if analysis.spending_patterns:
-                response_data["spending_patterns"] = json.loads(analysis.spending_patterns)
-            if analysis.anomalies:
-                response_data["anomalies"] = json.loads(analysis.anomalies)
-            if analysis.insights:
-                response_data["insights"] = json.loads(analysis.insights)
-            if analysis.recommendations:
-                response_data["recommendations"] = json.loads(analysis.recommendations)
-            if analysis.risk_assessment:
-                response_data["risk_assessment"] = json.loads(analysis.risk_assessment)
-        except json.JSONDecodeError:
-            pass
-        
         return AnalysisResponse(**response_data)
         
     except HTTPException:
@@ -265,7 +243,8 @@ def delete_analysis(
     try:
         analysis = analysis_service.get(db, analysis_id)
         
-        if not analysis or analysis.user_id != current_user.id:
+        # Already soft-deleted analyses are gone as far as the caller is concerned
+        if not analysis or not analysis.is_active or analysis.user_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Analysis not found"
@@ -320,7 +299,7 @@ def get_analysis_stats(
         )
 
 
-@router.post("/batch-analyze")
+@router.post("/batch-analyze", status_code=status.HTTP_202_ACCEPTED)
 def batch_analyze_statements(
     statement_ids: List[int],
     analysis_type: str = "comprehensive",
@@ -360,7 +339,8 @@ def batch_analyze_statements(
             "message": "Batch analysis started",
             "task_id": task.id,
             "statement_count": len(valid_statement_ids),
-            "status": "queued"
+            "status": "queued",
+            "status_url": f"{settings.API_V1_STR}/analyses/task/{task.id}/status"
         }
         
     except HTTPException:
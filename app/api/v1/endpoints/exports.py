@@ -1,18 +1,21 @@
 """Export endpoints for analysis data"""
 
-from typing import List, Optional
+import uuid
+from typing import Iterator, List, Optional
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
 from app.api.deps import get_current_active_user
 from app.schemas.export import ExportRequest, ExportResponse
-from app.services.export_service import export_service
+from app.services.export_service import EXPORT_FILE_TYPES, export_service
 from app.models.user import User
 from app.core.exceptions import ValidationError, FileProcessingError
 from app.core.logging import get_logger
-import io
+from app.tasks.celery_app import celery_app
+from app.tasks.export_tasks import process_bulk_export
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -34,18 +37,24 @@ def export_analysis_data(
                 detail=f"Invalid format. Supported formats: {', '.join(valid_formats)}"
             )
 
-
-        exported_data = export_service.export_analysis_data(
-            db=db,
-            user_id=current_user.id,
-            export_format=export_request.format,
-            start_date=export_request.start_date,
-            end_date=export_request.end_date,
-            statement_ids=export_request.statement_ids,
-            analysis_types=export_request.analysis_types,
-            include_charts=export_request.include_charts
-        )
-
+        # Streamed CSV keeps reading from its cursor after this handler returns, when
+        # the request session has already been closed, so it gets its own session
+        export_db = SessionLocal() if export_request.format.lower() == 'csv' else db
+        try:
+            exported_data = export_service.export_analysis_data(
+                db=export_db,
+                user_id=current_user.id,
+                export_format=export_request.format,
+                start_date=export_request.start_date,
+                end_date=export_request.end_date,
+                statement_ids=export_request.statement_ids,
+                analysis_types=export_request.analysis_types,
+                include_charts=export_request.include_charts
+            )
+        except Exception:
+            if export_db is not db:
+                export_db.close()
+            raise
 
         content_type, file_extension = _get_content_type_and_extension(export_request.format)
         filename = f"financial_analysis_{export_request.start_date or 'all'}_{export_request.end_date or 'data'}.{file_extension}"
@@ -57,10 +66,17 @@ def export_analysis_data(
             filename=filename
         )
 
+        headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+        # PDF and XLSX can only be finalised once the whole document is laid out, so
+        # they are sent in one write with a Content-Length; CSV streams as it is read
+        if isinstance(exported_data, bytes):
+            return Response(content=exported_data, media_type=content_type, headers=headers)
+
         return StreamingResponse(
-            io.BytesIO(exported_data),
+            _stream_and_close(exported_data, export_db),
             media_type=content_type,
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers=headers
         )
 
     except (ValidationError, FileProcessingError) as e:
@@ -81,6 +97,127 @@ def export_analysis_data(
         )
 
 
+@router.post("/analysis/async", status_code=status.HTTP_202_ACCEPTED)
+def queue_analysis_export(
+        export_request: ExportRequest,
+        current_user: User = Depends(get_current_active_user)
+):
+    """Queue an export to be rendered in the background and uploaded for download"""
+    try:
+        task = process_bulk_export.apply_async(
+            kwargs=dict(
+                user_id=current_user.id,
+                export_format=export_request.format,
+                start_date=export_request.start_date.isoformat() if export_request.start_date else None,
+                end_date=export_request.end_date.isoformat() if export_request.end_date else None,
+                statement_ids=export_request.statement_ids,
+                analysis_types=export_request.analysis_types,
+                include_charts=export_request.include_charts
+            ),
+            # The owner is part of the ID, so status checks need no lookup to authorize
+            task_id=f"{current_user.id}-{uuid.uuid4()}"
+        )
+
+        logger.info(
+            "Export task queued",
+            task_id=task.id,
+            user_id=current_user.id,
+            format=export_request.format
+        )
+
+        return {
+            "message": "Export started",
+            "task_id": task.id,
+            "status": "queued",
+            "status_url": f"{settings.API_V1_STR}/exports/task/{task.id}/status"
+        }
+
+    except Exception as e:
+        logger.error(
+            "Failed to queue export",
+            error=str(e),
+            user_id=current_user.id,
+            format=export_request.format
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to start export"
+        )
+
+
+@router.get("/task/{task_id}/status")
+def get_export_task_status(
+        task_id: str,
+        current_user: User = Depends(get_current_active_user)
+):
+    """Get status of a background export, with its download URL once completed"""
+    # Checked before any state is read, so errors and download URLs only reach the owner
+    if not task_id.startswith(f"{current_user.id}-"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export not found"
+        )
+
+    try:
+        task_result = celery_app.AsyncResult(task_id)
+
+        if task_result.state == "PENDING":
+            return {
+                "task_id": task_id,
+                "status": "pending",
+                "message": "Task is waiting to be processed"
+            }
+        elif task_result.state == "STARTED":
+            return {
+                "task_id": task_id,
+                "status": "processing",
+                "message": "Export started"
+            }
+        elif task_result.state == "PROGRESS":
+            return {
+                "task_id": task_id,
+                "status": "processing",
+                "current": task_result.info.get("current", 0),
+                "total": task_result.info.get("total", 100),
+                "message": task_result.info.get("status", "Processing...")
+            }
+        elif task_result.state == "RETRY":
+            return {
+                "task_id": task_id,
+                "status": "processing",
+                "message": "Export is being retried"
+            }
+        elif task_result.state == "SUCCESS":
+            return {
+                "task_id": task_id,
+                "status": "completed",
+                "result": task_result.result
+            }
+        else:  # FAILURE or REVOKED
+            return {
+                "task_id": task_id,
+                "status": "failed",
+                "error": str(task_result.info)
+            }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get export task status", error=str(e), task_id=task_id)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get task status"
+        )
+
+
+def _stream_and_close(chunks: Iterator[bytes], db: Session) -> Iterator[bytes]:
+    """Yield streamed export chunks, closing their dedicated session when done"""
+    try:
+        yield from chunks
+    finally:
+        db.close()
+
+
 @router.get("/formats")
 def get_supported_formats(
         current_user: User = Depends(get_current_active_user)
@@ -228,14 +365,7 @@ def get_export_templates(
 
 def _get_content_type_and_extension(format: str) -> tuple[str, str]:
     """Get content type and file extension for format"""
-    format_map = {
-        'pdf': ('application/pdf', 'pdf'),
-        'csv': ('text/csv', 'csv'),
-        'excel': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
-        'json': ('application/json', 'json'),
-        'png': ('image/png', 'png')
-    }
-    return format_map.get(format.lower(), ('application/octet-stream', 'bin'))
+    return EXPORT_FILE_TYPES.get(format.lower(), ('application/octet-stream', 'bin'))
 
 
 def _estimate_export_size(analyses: List, format: str) -> str:
@@ -1,5 +1,6 @@
 """Bank statement management endpoints"""
 
+import asyncio
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
@@ -19,6 +20,9 @@ from app.core.logging import get_logger
 router = APIRouter()
 logger = get_logger(__name__)
 
+# Files from one request uploaded to Cloudinary at the same time
+UPLOAD_CONCURRENCY = 8
+
 
 @router.post("/upload", response_model=List[StatementUploadResponse])
 async def upload_statement(
@@ -31,65 +35,70 @@ async def upload_statement(
     current_user: User = Depends(get_current_active_user)
 ):
     """Upload a new bank statement"""
-    responses = []
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
 
-    for file in files:
-        try:
-            statement_data = StatementCreate(
-                category=category,
-                bank_name=bank_name,
-                account_type=account_type,
-                notes=notes
-            )
+    async def upload_one(file: UploadFile) -> StatementUploadResponse:
+        async with semaphore:
+            try:
+                statement_data = StatementCreate(
+                    category=category,
+                    bank_name=bank_name,
+                    account_type=account_type,
+                    notes=notes
+                )
 
-            statement = await statement_service.upload_statement(
-                db, file, current_user.id, statement_data
-            )
+                statement = await statement_service.upload_statement(
+                    db, file, current_user.id, statement_data
+                )
 
-            logger.info(
-                "Statement uploaded successfully",
-                statement_id=statement.id,
-                user_id=current_user.id,
-                filename=file.filename
-            )
+                logger.info(
+                    "Statement uploaded successfully",
+                    statement_id=statement.id,
+                    user_id=current_user.id,
+                    filename=file.filename
+                )
 
-            responses.append(StatementUploadResponse(
-                statement_id=statement.id,
-                filename=statement.original_filename,
-                file_size=statement.file_size,
-                status=statement.status,
-                message="Statement uploaded successfully"
-            ))
+                return StatementUploadResponse(
+                    statement_id=statement.id,
+                    filename=statement.original_filename,
+                    file_size=statement.file_size,
+                    status=statement.status,
+                    message="Statement uploaded successfully"
+                )
 
-        except (ValidationError, FileProcessingError) as e:
-            responses.append(StatementUploadResponse(
-                statement_id=None,
-                filename=file.filename,
-                file_size=0,
-                status="FAILED",
-                message=str(e)
-            ))
-            logger.error(
-                "Statement upload failed",
-                error=str(e),
-                user_id=current_user.id,
-                filename=file.filename
-            )
+            except (ValidationError, FileProcessingError) as e:
+                logger.error(
+                    "Statement upload failed",
+                    error=str(e),
+                    user_id=current_user.id,
+                    filename=file.filename
+                )
+                return StatementUploadResponse(
+                    statement_id=None,
+                    filename=file.filename,
+                    file_size=0,
+                    status="FAILED",
+                    message=str(e)
+                )
 
-        except Exception as e:
-            responses.append(StatementUploadResponse(
-                statement_id=None,
-                filename=file.filename,
-                file_size=0,
-                status="FAILED",
-                message="Statement upload failed"
-            ))
-            logger.error(
-                "Statement upload failed",
-                error=str(e),
-                user_id=current_user.id,
-                filename=file.filename
-            )
+            except Exception as e:
+                logger.error(
+                    "Statement upload failed",
+                    error=str(e),
+                    user_id=current_user.id,
+                    filename=file.filename
+                )
+                return StatementUploadResponse(
+                    statement_id=None,
+                    filename=file.filename,
+                    file_size=0,
+                    status="FAILED",
+                    message="Statement upload failed"
+                )
+
+    # Cloudinary uploads overlap; the DB insert in each runs without awaiting, so the
+    # shared session is never used by two uploads at once
+    responses = await asyncio.gather(*(upload_one(file) for file in files))
 
     if not responses:
         raise HTTPException(
@@ -0,0 +1,37 @@
+"""Callback endpoints for external services"""
+
+import hmac
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Body, Header, HTTPException, status
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.cache_service import cache_service
+from app.services.pdf_service import adobe_job_signal_key
+
+router = APIRouter()
+logger = get_logger(__name__)
+
+
+@router.post("/adobe", status_code=status.HTTP_204_NO_CONTENT)
+def adobe_job_callback(
+    payload: Dict[str, Any] = Body(...),
+    x_webhook_secret: Optional[str] = Header(default=None)
+):
+    """Wake the conversion waiting on a finished Adobe export job"""
+    if not settings.ADOBE_WEBHOOK_SECRET or not hmac.compare_digest(
+        x_webhook_secret or "", settings.ADOBE_WEBHOOK_SECRET
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook secret"
+        )
+
+    job_id = payload.get("jobID") or payload.get("jobId")
+    if not job_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Missing job ID"
+        )
+
+    cache_service.notify_sync(adobe_job_signal_key(job_id), settings.ADOBE_WEBHOOK_TIMEOUT_SECONDS)
+    logger.info("Adobe job callback received", job_id=job_id)
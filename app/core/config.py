@@ -14,25 +14,40 @@ class Settings(BaseSettings):
     APP_NAME: str = "IntelliBank API"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = Field(default=False, env="DEBUG")
+    LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
+    # Defaults to DEBUG when unset
+    EMIT_TIMING_HEADER: Optional[bool] = Field(default=None, env="EMIT_TIMING_HEADER")
     API_V1_STR: str = "/api/v1"
     
     # Server
     HOST: str = Field(default="0.0.0.0", env="HOST")
     PORT: int = Field(default=8000, env="PORT")
+    # Async workers each serve many requests, so one per core (ignored with DEBUG reload)
+    WORKERS: int = Field(default_factory=lambda: os.cpu_count() or 1, env="WORKERS")
+    # In-flight requests per worker before new ones get 503
+    MAX_CONCURRENCY: int = Field(default=200, env="MAX_CONCURRENCY")
     
     # Database
     DATABASE_URL: str = Field(..., env="DATABASE_URL")
     DATABASE_POOL_SIZE: int = Field(default=20, env="DATABASE_POOL_SIZE")
     DATABASE_MAX_OVERFLOW: int = Field(default=30, env="DATABASE_MAX_OVERFLOW")
+    DATABASE_QUERY_CACHE_SIZE: int = Field(default=1200, env="DATABASE_QUERY_CACHE_SIZE")
+    # Connections each API worker opens at startup, capped at the pool size; 0 disables
+    DATABASE_WARM_CONNECTIONS: int = Field(default=2, env="DATABASE_WARM_CONNECTIONS")
     
     # Redis
     REDIS_URL: str = Field(..., env="REDIS_URL")
+    ANALYSIS_CACHE_TTL_SECONDS: int = Field(default=86400, env="ANALYSIS_CACHE_TTL_SECONDS")
+    EXPORT_CACHE_TTL_SECONDS: int = Field(default=600, env="EXPORT_CACHE_TTL_SECONDS")
+    EXPORT_DOWNLOAD_URL_TTL_SECONDS: int = Field(default=86400, env="EXPORT_DOWNLOAD_URL_TTL_SECONDS")
     
     # Security
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=7, env="REFRESH_TOKEN_EXPIRE_DAYS")
     ALGORITHM: str = "HS256"
+    # bcrypt cost factor; 0 lets `python main.py` benchmark the host once at startup (12 otherwise)
+    PASSWORD_HASH_ROUNDS: int = Field(default=0, env="PASSWORD_HASH_ROUNDS")
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = Field(
@@ -40,9 +55,15 @@ class Settings(BaseSettings):
         env="BACKEND_CORS_ORIGINS"
     )
     
+    # Trusted hosts, in addition to localhost; not checked with DEBUG
+    EXTRA_HOSTS: List[str] = Field(default=[], env="EXTRA_HOSTS")
+    
     # Adobe PDF Services
     ADOBE_CLIENT_ID: str = Field(..., env="ADOBE_CLIENT_ID")
     ADOBE_CLIENT_SECRET: str = Field(..., env="ADOBE_CLIENT_SECRET")
+    ADOBE_WEBHOOK_URL: Optional[str] = Field(default=None, env="ADOBE_WEBHOOK_URL")
+    ADOBE_WEBHOOK_SECRET: Optional[str] = Field(default=None, env="ADOBE_WEBHOOK_SECRET")
+    ADOBE_WEBHOOK_TIMEOUT_SECONDS: int = Field(default=300, env="ADOBE_WEBHOOK_TIMEOUT_SECONDS")
     
     # Cloudinary
     CLOUDINARY_CLOUD_NAME: str = Field(..., env="CLOUDINARY_CLOUD_NAME")
@@ -52,6 +73,11 @@ class Settings(BaseSettings):
     # Google Gemini
     GEMINI_API_KEY: str = Field(..., env="GEMINI_API_KEY")
     GEMINI_MODEL: str = Field(default="gemini-pro", env="GEMINI_MODEL")
+    GEMINI_MAX_CONCURRENCY: int = Field(default=8, env="GEMINI_MAX_CONCURRENCY")
+    GEMINI_RPM: int = Field(default=60, env="GEMINI_RPM")
+    GEMINI_CIRCUIT_FAIL_MAX: int = Field(default=5, env="GEMINI_CIRCUIT_FAIL_MAX")
+    GEMINI_CIRCUIT_RESET_SECONDS: int = Field(default=30, env="GEMINI_CIRCUIT_RESET_SECONDS")
+    GEMINI_CACHE_TTL_SECONDS: int = Field(default=3600, env="GEMINI_CACHE_TTL_SECONDS")
     
     # File Processing
     MAX_FILE_SIZE: int = Field(default=50 * 1024 * 1024, env="MAX_FILE_SIZE")  # 50MB
@@ -68,7 +94,11 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = Field(default=60, env="RATE_LIMIT_PER_MINUTE")
     
-    @validator("BACKEND_CORS_ORIGINS", pre=True)
+    @validator("EMIT_TIMING_HEADER", always=True)
+    def default_timing_header_to_debug(cls, v, values):
+        return values.get("DEBUG", False) if v is None else v
+    
+    @validator("BACKEND_CORS_ORIGINS", "EXTRA_HOSTS", pre=True)
     def assemble_cors_origins(cls, v):
         if isinstance(v, str) and not v.startswith("["):
             return [i.strip() for i in v.split(",")]
@@ -42,6 +42,11 @@ class ExternalServiceError(IntelliBaseException):
     pass
 
 
+class ServiceUnavailableError(ExternalServiceError):
+    """External service temporarily unavailable exception"""
+    pass
+
+
 class DatabaseError(IntelliBaseException):
     """Database operation error exception"""
     pass
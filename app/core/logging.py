@@ -1,13 +1,52 @@
 """Structured logging configuration"""
 
+import atexit
+import logging
+import queue
 import sys
+import orjson
 import structlog
-from typing import Any, Dict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
 from app.core.config import settings
 
+# Records waiting for the writer thread; further records are dropped when full
+LOG_QUEUE_SIZE = 10000
+
+_listener: Optional[QueueListener] = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def _orjson_dumps(obj: Any, **kwargs: Any) -> str:
+    """Serialize a log event with orjson, decoded for the stdlib handlers"""
+    return orjson.dumps(
+        obj, default=kwargs.get("default"), option=orjson.OPT_NON_STR_KEYS
+    ).decode()
+
 
 def configure_logging() -> None:
     """Configure structured logging"""
+    global _listener
+    
+    # Callers only enqueue records; a background thread formats and writes them
+    if _listener is None:
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+        _listener.start()
+        atexit.register(_listener.stop)
+        
+        root_logger = logging.getLogger()
+        root_logger.handlers = [DroppingQueueHandler(log_queue)]
+        root_logger.setLevel(settings.LOG_LEVEL)
     
     # Configure structlog
     structlog.configure(
@@ -20,7 +59,7 @@ def configure_logging() -> None:
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer() if not settings.DEBUG 
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps) if not settings.DEBUG 
             else structlog.dev.ConsoleRenderer(),
         ],
         context_class=dict,
@@ -0,0 +1,116 @@
+"""ASGI middleware for request observability and load shedding"""
+
+import asyncio
+import logging
+from time import perf_counter
+from typing import Dict
+from starlette.datastructures import URL
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# High-frequency, low-value requests left out of the request log
+UNLOGGED_METHODS = frozenset({"OPTIONS", "HEAD"})
+
+# Sent instead of queueing once the worker is at its in-flight limit
+OVERLOADED_RESPONSE = JSONResponse(
+    {"error": "Server is busy, please retry shortly"},
+    status_code=503,
+    headers={"Retry-After": "1"}
+)
+
+
+class ObservabilityMiddleware:
+    """Log all requests, optionally add processing time header and shed load past max_concurrency"""
+
+    def __init__(self, app: ASGIApp, max_concurrency: int, emit_timing_header: bool = True):
+        self.app = app
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.emit_timing_header = emit_timing_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Raw ASGI wrapper: only headers and status are touched, so the body
+        # streams straight through without BaseHTTPMiddleware's buffering
+        start_time = perf_counter()
+        # Checked per request since configure_logging may set the level after import;
+        # CORS preflights and HEAD health probes are timed but not logged
+        log_info = (
+            scope["method"] not in UNLOGGED_METHODS
+            and logger.isEnabledFor(logging.INFO)
+        )
+        status_code = None
+
+        if log_info:
+            # Read straight from the scope rather than building a Request
+            method = scope["method"]
+            url = str(URL(scope=scope))
+            client = scope.get("client")
+
+            # Log request
+            logger.info(
+                "Request started",
+                method=method,
+                url=url,
+                client_ip=client[0] if client else None
+            )
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.emit_timing_header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-process-time", f"{perf_counter() - start_time:.6f}".encode()))
+                    message["headers"] = headers
+            await send(message)
+
+        # Only wrap send when something reads the response start
+        inner_send = send_wrapper if log_info or self.emit_timing_header else send
+
+        if self.semaphore.locked():
+            await OVERLOADED_RESPONSE(scope, receive, inner_send)
+        else:
+            async with self.semaphore:
+                await self.app(scope, receive, inner_send)
+
+        # Log response
+        if log_info:
+            process_time = perf_counter() - start_time
+            logger.info(
+                "Request completed",
+                method=method,
+                url=url,
+                status_code=status_code,
+                process_time=process_time
+            )
+
+
+class StaticRouteMiddleware:
+    """Answer GETs for constant JSON routes without going through routing"""
+
+    def __init__(self, app: ASGIApp, routes: Dict[str, bytes]):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        body = self.routes.get(scope["path"]) if scope["type"] == "http" else None
+        if body is None or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,5 +1,6 @@
 """Security utilities for authentication and authorization"""
 
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Union, Any
 from jose import jwt, JWTError
@@ -9,8 +10,32 @@ from pydantic import ValidationError
 
 from app.core.config import settings
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Tuning picks the lowest cost whose verify takes at least the target time, within these bounds
+PASSWORD_HASH_TARGET_SECONDS = 0.2
+PASSWORD_HASH_MIN_ROUNDS = 10
+PASSWORD_HASH_MAX_ROUNDS = 14
+# passlib's bcrypt default, used until a tuned or pinned cost is set
+DEFAULT_PASSWORD_HASH_ROUNDS = 12
+
+
+def tune_password_hash_rounds() -> int:
+    """Pick the lowest bcrypt cost whose verify takes at least the target time on this host"""
+    for rounds in range(PASSWORD_HASH_MIN_ROUNDS, PASSWORD_HASH_MAX_ROUNDS):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        hashed = context.hash("password-hash-benchmark")
+        started = time.perf_counter()
+        context.verify("password-hash-benchmark", hashed)
+        if time.perf_counter() - started >= PASSWORD_HASH_TARGET_SECONDS:
+            return rounds
+    return PASSWORD_HASH_MAX_ROUNDS
+
+
+# Password hashing context; the benchmark runs once in main.py rather than on every import
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS or DEFAULT_PASSWORD_HASH_ROUNDS
+)
 
 
 class SecurityService:
@@ -26,6 +51,11 @@ class SecurityService:
         """Verify password against hash"""
         return pwd_context.verify(plain_password, hashed_password)
     
+    @staticmethod
+    def dummy_verify_password() -> None:
+        """Spend the time of a password check when there is no hash to check against"""
+        pwd_context.dummy_verify()
+    
     @staticmethod
     def create_access_token(
         subject: Union[str, Any], 
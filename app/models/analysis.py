@@ -1,6 +1,7 @@
 """Analysis model for storing AI-generated insights"""
 
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Float, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, Float, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -9,6 +10,10 @@ class Analysis(BaseModel):
     """Analysis results model"""
     
     __tablename__ = "analyses"
+    __table_args__ = (
+        Index("ix_analyses_user_id_created_at", "user_id", "created_at"),
+    )
+
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     statement_id = Column(Integer, ForeignKey("statements.id"), nullable=False)
     
@@ -25,18 +30,18 @@ class Analysis(BaseModel):
     closing_balance = Column(Float, nullable=True)
     
     # Analysis results (JSON fields)
-    transaction_categories = Column(JSON, nullable=True)
-    spending_patterns = Column(JSON, nullable=True)
-    income_analysis = Column(JSON, nullable=True)
-    anomalies = Column(JSON, nullable=True)
-    insights = Column(JSON, nullable=True)
-    recommendations = Column(JSON, nullable=True)
-    risk_assessment = Column(JSON, nullable=True)
+    transaction_categories = Column(JSONB, nullable=True)
+    spending_patterns = Column(JSONB, nullable=True)
+    income_analysis = Column(JSONB, nullable=True)
+    anomalies = Column(JSONB, nullable=True)
+    insights = Column(JSONB, nullable=True)
+    recommendations = Column(JSONB, nullable=True)
+    risk_assessment = Column(JSONB, nullable=True)
     financial_health_score = Column(Float, nullable=True)
     
     # Raw data
-    transactions_data = Column(JSON, nullable=True)
-    excel_data_summary = Column(JSON, nullable=True)
+    transactions_data = Column(JSONB, nullable=True)
+    excel_data_summary = Column(JSONB, nullable=True)
     
     # AI-generated content
     summary_text = Column(Text, nullable=True)
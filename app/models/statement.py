@@ -1,6 +1,6 @@
 """Bank statement model"""
 
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Float, Enum
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, Float, Enum, Index, text
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
 from app.models.base import BaseModel
@@ -8,6 +8,7 @@ from app.models.base import BaseModel
 
 class StatementStatus(PyEnum):
     """Statement processing status"""
+    UPLOADING = "uploading"
     UPLOADED = "uploaded"
     PROCESSING = "processing"
     COMPLETED = "completed"
@@ -27,7 +28,26 @@ class Statement(BaseModel):
     """Bank statement model"""
     
     __tablename__ = "statements"
-    
+    __table_args__ = (
+        Index("ix_statements_user_id_created_at", "user_id", "created_at"),
+        Index(
+            "uq_statements_user_id_content_sha256", "user_id", "content_sha256",
+            unique=True, postgresql_where=text("is_active")
+        ),
+        Index(
+            "ix_statements_original_filename_trgm", "original_filename",
+            postgresql_using="gin", postgresql_ops={"original_filename": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_statements_bank_name_trgm", "bank_name",
+            postgresql_using="gin", postgresql_ops={"bank_name": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_statements_notes_trgm", "notes",
+            postgresql_using="gin", postgresql_ops={"notes": "gin_trgm_ops"}
+        ),
+    )
+
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
@@ -35,6 +55,7 @@ class Statement(BaseModel):
     file_type = Column(String(50), nullable=False)
     cloudinary_public_id = Column(String(255), nullable=True)
     cloudinary_url = Column(Text, nullable=True)
+    content_sha256 = Column(String(64), nullable=True)
     
     # Processing status
     status = Column(Enum(StatementStatus), default=StatementStatus.UPLOADED, nullable=False)
@@ -16,6 +16,25 @@ class AnalysisCreate(AnalysisBase):
     statement_id: int
 
 
+class AnalysisSummary(BaseSchema):
+    """Headline figures returned by the AI analysis"""
+    total_income: float
+    total_expenses: float
+    net_cash_flow: float
+    transaction_count: int = 0
+    financial_health_score: Optional[float] = None
+
+
+class DocumentInfo(BaseSchema):
+    """Statement metadata extracted by the AI analysis"""
+    bank_name: Optional[str] = None
+    account_type: Optional[str] = None
+    statement_period_start: Optional[str] = None
+    statement_period_end: Optional[str] = None
+    opening_balance: Optional[float] = None
+    closing_balance: Optional[float] = None
+
+
 class TransactionCategory(BaseSchema):
     """Transaction category schema"""
     category: str
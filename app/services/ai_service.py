@@ -1,23 +1,33 @@
 """AI service for financial analysis using Google Gemini with direct file upload"""
 
-import json
-import tempfile
+import asyncio
+import io
 import os
-from typing import Dict, List, Any, Optional
+import httpx
+import orjson
+import re
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
 from google import genai
+from google.genai import types
+from google.genai import errors as genai_errors
 from datetime import datetime, timedelta
 from app.core.config import settings
 from app.core.logging import LoggerMixin
-from app.core.exceptions import ExternalServiceError
+from app.core.exceptions import ExternalServiceError, ServiceUnavailableError
+from app.services.rate_limiter import gemini_limiter
 from app.schemas.analysis import (
     TransactionCategory, SpendingPattern, Anomaly, 
     Insight, Recommendation, RiskAssessment
 )
-import json
 
-import re
-import hashlib
-from typing import Dict, Any, List
+import re2  # RE2 DFA engine: linear-time matching on untrusted statement text
+import zlib
+from bisect import bisect_right
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping
 import fitz  # PyMuPDF for PDF processing
 from dataclasses import dataclass
 
@@ -30,197 +40,206 @@ class SanitizationConfig:
     redact_addresses: bool = True
     redact_names: bool = True
     redact_ssn: bool = True
+    consistent_tokens: bool = False  # hash-based per-value tokens instead of fixed [CATEGORY] redactions
     preserve_transaction_amounts: bool = True
     preserve_dates: bool = True
     preserve_merchant_names: bool = True
 
-class BankStatementSanitizer:
-    def __init__(self, config: SanitizationConfig = None):
-        self.config = config or SanitizationConfig()
-        self.replacement_map = {}  # Store original -> sanitized mappings
-        self.logger = LoggerMixin
-
-    def _generate_consistent_replacement(self, original_value: str, prefix: str) -> str:
-        """Generate consistent replacement for same values"""
-        self.logger.log_operation("generating_replacement", original_value=original_value, prefix=prefix)
-        if original_value in self.replacement_map:
-            return self.replacement_map[original_value]
-
-        # Create hash-based consistent replacement
-        hash_obj = hashlib.md5(original_value.encode())
-        hash_hex = hash_obj.hexdigest()[:8]
-        replacement = f"{prefix}_{hash_hex}"
-
-        self.replacement_map[original_value] = replacement
-        return replacement
-
-    def _sanitize_account_numbers(self, text: str) -> str:
-        """Replace account numbers with sanitized versions"""
-        self.logger.log_operation("sanitizing_account_numbers")
-        if not self.config.redact_account_numbers:
-            return text
 
-        # Pattern for account numbers (8-17 digits, possibly with dashes/spaces)
-        account_pattern = r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4,9}\b'
+# (placeholder prefix, config flag, patterns) in priority order: when two categories
+# match at the same position the earlier one wins, mirroring the old pass order.
+_PII_PATTERNS = (
+    ("ACCT", "redact_account_numbers", (
+        r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4,9}\b',  # 8-17 digits, possibly with dashes/spaces
+    )),
+    ("PHONE", "redact_phone_numbers", (
+        r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b',  # US format
+        r'\(\d{3}\)\s?\d{3}[-.\s]?\d{4}',      # (123) 456-7890
+        r'\+\d{1,3}[-.\s]?\d{3,14}\b',          # International
+    )),
+    ("EMAIL", "redact_emails", (
+        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    )),
+    ("SSN", "redact_ssn", (
+        r'\b\d{3}[-\s]?\d{2}[-\s]?\d{4}\b',
+    )),
+    # Simple address patterns - you may need more sophisticated NER
+    ("ADDRESS", "redact_addresses", (
+        r'(?i:\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd|Way|Place|Pl)\b)',
+        r'(?i:P\.?O\.?\s+Box\s+\d+)',
+    )),
+    # Basic title-based detection - consider using NER libraries like spaCy
+    ("NAME", "redact_names", (
+        r'\b(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?|Prof\.?)\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*',
+    )),
+)
 
-        def replace_account(match):
-            account = match.group(0)
-            return self._generate_consistent_replacement(account, "ACCT")
 
-        return re.sub(account_pattern, replace_account, text)
+@lru_cache(maxsize=None)
+def _compile_pii_regex(prefixes: Tuple[str, ...]) -> Optional[Any]:
+    """Compile one alternation covering the given PII categories, shared across sanitizers"""
+    groups = [
+        f"(?P<{prefix}>{'|'.join(patterns)})"
+        for prefix, _, patterns in _PII_PATTERNS
+        if prefix in prefixes
+    ]
+    return re2.compile("|".join(groups)) if groups else None
 
-    def _sanitize_phone_numbers(self, text: str) -> str:
-        """Replace phone numbers"""
-        self.logger.log_operation("sanitizing_phone_numbers")
-        if not self.config.redact_phone_numbers:
-            return text
 
-        phone_patterns = [
-            r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b',  # US format
-            r'\(\d{3}\)\s?\d{3}[-.\s]?\d{4}',      # (123) 456-7890
-            r'\+\d{1,3}[-.\s]?\d{3,14}\b'          # International
-        ]
+# A cheap literal probe per category: every match of the category contains one of these,
+# so text without any of them cannot contain that kind of PII
+_PII_PROBES = {
+    "ACCT": r"\d",
+    "PHONE": r"\d",
+    "EMAIL": "@",
+    "SSN": r"\d",
+    "ADDRESS": r"\d",
+    "NAME": r"Mr|Ms|Dr|Prof",
+}
 
-        for pattern in phone_patterns:
-            def replace_phone(match):
-                phone = match.group(0)
-                return self._generate_consistent_replacement(phone, "PHONE")
-            text = re.sub(pattern, replace_phone, text)
 
-        return text
+@lru_cache(maxsize=None)
+def _compile_pii_probe(prefixes: Tuple[str, ...]) -> Optional[Any]:
+    """Compile the pre-filter that rules out text which cannot match the given categories"""
+    probes = sorted({_PII_PROBES[prefix] for prefix in prefixes})
+    return re2.compile("|".join(probes)) if probes else None
 
-    def _sanitize_emails(self, text: str) -> str:
-        """Replace email addresses"""
-        self.logger.log_operation("sanitizing_emails")
-        if not self.config.redact_emails:
-            return text
 
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+_REDACTION_TOKENS = {prefix: f"[{prefix}]" for prefix, _, _ in _PII_PATTERNS}
 
-        def replace_email(match):
-            email = match.group(0)
-            return self._generate_consistent_replacement(email, "EMAIL")
 
-        return re.sub(email_pattern, replace_email, text)
+def _redaction_token(match: Any) -> str:
+    """Fixed per-category redaction, avoiding hashing when consistency is not needed"""
+    return _REDACTION_TOKENS[match.lastgroup]
 
-    def _sanitize_addresses(self, text: str) -> str:
-        """Replace street addresses (basic implementation)"""
-        self.logger.log_operation("sanitizing_addresses")
-        if not self.config.redact_addresses:
-            return text
 
-        # Simple address patterns - you may need more sophisticated NER
-        address_patterns = [
-            r'\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Boulevard|Blvd|Way|Place|Pl)\b',
-            r'P\.?O\.?\s+Box\s+\d+',
-        ]
+# Compile the default (everything enabled) alternation at import time
+_compile_pii_regex(tuple(prefix for prefix, _, _ in _PII_PATTERNS))
 
-        for pattern in address_patterns:
-            def replace_address(match):
-                address = match.group(0)
-                return self._generate_consistent_replacement(address, "ADDRESS")
-            text = re.sub(pattern, replace_address, text, flags=re.IGNORECASE)
 
-        return text
+class BankStatementSanitizer(LoggerMixin):
+    def __init__(self, config: SanitizationConfig = None):
+        self.config = config or SanitizationConfig()
+        self.replacement_map = {}  # Store original -> sanitized mappings
+        enabled = tuple(prefix for prefix, flag, _ in _PII_PATTERNS if getattr(self.config, flag))
+        self._pii_re = _compile_pii_regex(enabled)
+        self._pii_probe = _compile_pii_probe(enabled)
+        self._substitute = self._replace_match if self.config.consistent_tokens else _redaction_token
 
-    def _sanitize_ssn(self, text: str) -> str:
-        """Replace Social Security Numbers"""
-        if not self.config.redact_ssn:
-            return text
+    def _generate_consistent_replacement(self, original_value: str, prefix: str) -> str:
+        """Generate consistent replacement for same values"""
+        if original_value in self.replacement_map:
+            return self.replacement_map[original_value]
 
-        ssn_pattern = r'\b\d{3}[-\s]?\d{2}[-\s]?\d{4}\b'
+        # Tokens only need to be stable, not secure: CRC32 is deterministic and far cheaper than MD5
+        replacement = f"{prefix}_{zlib.crc32(original_value.encode()):08x}"
 
-        def replace_ssn(match):
-            ssn = match.group(0)
-            return self._generate_consistent_replacement(ssn, "SSN")
+        self.replacement_map[original_value] = replacement
+        return replacement
 
-        return re.sub(ssn_pattern, replace_ssn, text)
+    def _replace_match(self, match: Any) -> str:
+        """Swap a PII match for its consistent placeholder, prefixed by its category"""
+        return self._generate_consistent_replacement(match.group(), match.lastgroup)
 
-    def _sanitize_names(self, text: str) -> str:
-        """Replace common name patterns (basic implementation)"""
-        if not self.config.redact_names:
+    def sanitize_text(self, text: str) -> str:
+        """Apply all sanitization rules to text in a single regex pass"""
+        if self._pii_re is None or not self._pii_probe.search(text):
             return text
-
-        # This is a basic implementation - consider using NER libraries like spaCy
-        # Pattern for capitalized words that might be names
-        name_indicators = [
-            r'\b(?:Mr\.?|Mrs\.?|Ms\.?|Dr\.?|Prof\.?)\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*',
-            # Add more sophisticated name detection as needed
+        sanitized, count = self._pii_re.subn(self._substitute, text)
+        # Hand back the original object when nothing matched so callers can test identity
+        return sanitized if count else text
+
+    def _sanitize_page(self, page: fitz.Page) -> None:
+        """Redact PII spans on a single page in place"""
+        if self._pii_re is None:
+            return
+
+        # Extract text spans
+        text_dict = page.get_text("dict")
+        spans = [
+            span
+            for block in text_dict["blocks"] if "lines" in block
+            for line in block["lines"]
+            for span in line["spans"]
         ]
 
-        for pattern in name_indicators:
-            def replace_name(match):
-                name = match.group(0)
-                return self._generate_consistent_replacement(name, "NAME")
-            text = re.sub(pattern, replace_name, text)
-
-        return text
-
-    def sanitize_text(self, text: str) -> str:
-        """Apply all sanitization rules to text"""
-        sanitized = text
-
-        # Apply sanitization in order
-        sanitized = self._sanitize_account_numbers(sanitized)
-        sanitized = self._sanitize_phone_numbers(sanitized)
-        sanitized = self._sanitize_emails(sanitized)
-        sanitized = self._sanitize_ssn(sanitized)
-        sanitized = self._sanitize_addresses(sanitized)
-        sanitized = self._sanitize_names(sanitized)
-
-        return sanitized
+        # Scan the whole page in one pass; \x1f is neither whitespace nor a word character
+        # to RE2, so no match can straddle two spans and \b behaves as at a span edge
+        span_starts = []
+        position = 0
+        for span in spans:
+            span_starts.append(position)
+            position += len(span["text"]) + 1
+        page_text = "\x1f".join(span["text"] for span in spans)
+
+        hits_by_span: Dict[int, List[Tuple[int, int, str]]] = {}
+        for match in self._pii_re.finditer(page_text):
+            index = bisect_right(span_starts, match.start()) - 1
+            offset = span_starts[index]
+            hits_by_span.setdefault(index, []).append(
+                (match.start() - offset, match.end() - offset, self._substitute(match))
+            )
+
+        # Rebuild the text of every span that needs rewriting before touching the page
+        redactions = []
+        for index, hits in hits_by_span.items():
+            span = spans[index]
+            original_text = span["text"]
+            parts = []
+            last_end = 0
+            for start, end, replacement in hits:
+                parts.append(original_text[last_end:start])
+                parts.append(replacement)
+                last_end = end
+            parts.append(original_text[last_end:])
+            redactions.append((fitz.Rect(span["bbox"]), "".join(parts), span["size"]))
+
+        if not redactions:
+            return
+
+        # apply_redactions rewrites the whole content stream, so run it once per page
+        for rect, _, _ in redactions:
+            page.add_redact_annot(rect)
+        page.apply_redactions()
+
+        # Add sanitized text
+        for rect, sanitized_text, fontsize in redactions:
+            page.insert_text(
+                rect.tl,
+                sanitized_text,
+                fontsize=fontsize,
+                color=(0, 0, 0)
+            )
 
     def sanitize_pdf(self, pdf_bytes: bytes) -> bytes:
         """Sanitize a PDF document and return sanitized PDF bytes"""
-        self.logger.log_operation("sanitizing_pdf")
+        self.log_operation("sanitizing_pdf")
         # Open PDF from bytes
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        page_count = len(doc)
+
+        # Image-only (scanned) statements carry no text layer to redact; hand them back untouched.
+        # any() stops at the first page with text, so text PDFs pay for a single page here.
+        if not any(page.get_text("text").strip() for page in doc):
+            self.log_operation("sanitize_pdf_skipped_no_text_layer", page_count=page_count)
+            return pdf_bytes
 
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-
-            # Extract text blocks
-            text_dict = page.get_text("dict")
-
-            # Process each text block
-            for block in text_dict["blocks"]:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            original_text = span["text"]
-                            sanitized_text = self.sanitize_text(original_text)
-
-                            if original_text != sanitized_text:
-                                # Replace text in PDF
-                                rect = fitz.Rect(span["bbox"])
-                                page.add_redact_annot(rect)
-                                page.apply_redactions()
-
-                                # Add sanitized text
-                                page.insert_text(
-                                    rect.tl,
-                                    sanitized_text,
-                                    fontsize=span["size"],
-                                    color=(0, 0, 0)
-                                )
-
-        # Return sanitized PDF as bytes
+        for page in doc:
+            self._sanitize_page(page)
+
+        self.log_operation("sanitize_pdf_done", replacements=len(self.replacement_map), pages=page_count)
+        # Writing the original document keeps its metadata and outline
         return doc.write()
 
-    def get_replacement_map(self) -> Dict[str, str]:
-        """Get the mapping of original -> sanitized values for audit purposes"""
-        return self.replacement_map.copy()
+    def get_replacement_map(self) -> Mapping[str, str]:
+        """Get a read-only view of the original -> sanitized mapping for audit purposes"""
+        return MappingProxyType(self.replacement_map)
 
-class AIAnalysisService(LoggerMixin):
-    """Service for AI-powered financial analysis using Google Gemini with direct file upload"""
-    
-    def __init__(self):
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
-        
-    def _create_analysis_prompt(self, analysis_type: str = "comprehensive") -> str:
-        """Create comprehensive prompt for financial analysis"""
-        
-        prompt = f"""
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+# Static so it is built once per process rather than on every request
+_ANALYSIS_PROMPT = """
         You are a professional financial analyst with expertise in bank statement analysis. 
         Analyze the uploaded bank statement file and provide comprehensive financial insights.
         Note that sensitive personal information has been sanitized for privacy (account numbers, emails, phones, addresses 
@@ -312,24 +331,24 @@ class AIAnalysisService(LoggerMixin):
         - Be precise about dates and time periods
         
         Please format your response as a valid JSON object with the following structure:
-        {{
-            "document_info": {{
+        {
+            "document_info": {
                 "bank_name": "string or null",
                 "account_type": "string or null", 
                 "statement_period_start": "YYYY-MM-DD or null",
                 "statement_period_end": "YYYY-MM-DD or null",
                 "opening_balance": float or null,
                 "closing_balance": float or null
-            }},
-            "summary": {{
+            },
+            "summary": {
                 "total_income": float,
                 "total_expenses": float,
                 "net_cash_flow": float,
                 "transaction_count": int,
                 "financial_health_score": float (0-100)
-            }},
+            },
             "transaction_categories": [
-                {{
+                {
                     "category": "string",
                     "amount": float,
                     "count": int,
@@ -337,40 +356,40 @@ class AIAnalysisService(LoggerMixin):
                     "avg_transaction_amount": float,
                     "largest_transaction": float,
                     "is_recurring": boolean
-                }}
+                }
             ],
             "spending_patterns": [
-                {{
+                {
                     "pattern_type": "string",
                     "description": "string",
                     "frequency": "string",
                     "average_amount": float,
                     "confidence_score": float (0-1),
                     "examples": ["string"]
-                }}
+                }
             ],
-            "income_analysis": {{
+            "income_analysis": {
                 "primary_income": float,
                 "secondary_income": float,
                 "income_frequency": "string",
                 "income_stability": "string",
                 "income_sources": [
-                    {{
+                    {
                         "source": "string",
                         "amount": float,
                         "frequency": "string"
-                    }}
+                    }
                 ]
-            }},
-            "cash_flow_analysis": {{
+            },
+            "cash_flow_analysis": {
                 "average_daily_balance": float,
                 "lowest_balance": float,
                 "highest_balance": float,
                 "balance_volatility": "low|medium|high",
                 "cash_flow_trend": "improving|stable|declining"
-            }},
+            },
             "anomalies": [
-                {{
+                {
                     "transaction_date": "YYYY-MM-DD",
                     "description": "string",
                     "amount": float,
@@ -378,10 +397,10 @@ class AIAnalysisService(LoggerMixin):
                     "category": "string",
                     "reason": "string",
                     "confidence_score": float (0-1)
-                }}
+                }
             ],
             "insights": [
-                {{
+                {
                     "type": "spending|income|savings|cash_flow|general",
                     "title": "string",
                     "description": "string",
@@ -389,10 +408,10 @@ class AIAnalysisService(LoggerMixin):
                     "priority": "low|medium|high",
                     "actionable": boolean,
                     "supporting_data": "string"
-                }}
+                }
             ],
             "recommendations": [
-                {{
+                {
                     "category": "budgeting|savings|spending|income|general",
                     "title": "string",
                     "description": "string",
@@ -400,34 +419,218 @@ class AIAnalysisService(LoggerMixin):
                     "difficulty": "easy|medium|hard",
                     "timeframe": "immediate|short_term|long_term",
                     "priority": "low|medium|high"
-                }}
+                }
             ],
-            "risk_assessment": {{
+            "risk_assessment": {
                 "overall_risk": "low|medium|high",
                 "risk_factors": ["string"],
                 "risk_score": float (0-100),
                 "financial_stability": "stable|moderate|unstable",
                 "recommendations": ["string"]
-            }},
+            },
             "detailed_analysis": "string (comprehensive written analysis of 200-500 words)"
-        }}
+        }
         
         Ensure all numerical values are realistic and based on the actual data in the document.
         If you cannot determine specific values from the document, use null instead of making assumptions.
         """
+
+# Trimmed variants for lighter analysis types. They keep every top-level key that
+# AnalysisService.create_analysis reads, but ask for the skipped sections to come back empty.
+_SUMMARY_PROMPT = """
+        You are a professional financial analyst. Give a concise summary of the uploaded bank statement.
+        Sensitive personal information has been sanitized and replaced with placeholders.
+        Do NOT reproduce account numbers, names, addresses, phone numbers, emails or any other
+        personally identifiable information.
+        
+        1. DOCUMENT STRUCTURE: bank name, account type, statement period, opening and closing balances.
+        2. TRANSACTION CATEGORIZATION: group transactions into logical categories with total amount,
+           percentage and transaction count for each.
+        3. SPENDING PATTERNS: the main recurring transactions and their frequency.
+        
+        Base the analysis ONLY on data visible in the document; use null for anything you cannot determine.
+        
+        Respond with a valid JSON object with exactly this structure:
+        {
+            "document_info": {
+                "bank_name": "string or null",
+                "account_type": "string or null",
+                "statement_period_start": "YYYY-MM-DD or null",
+                "statement_period_end": "YYYY-MM-DD or null",
+                "opening_balance": float or null,
+                "closing_balance": float or null
+            },
+            "summary": {
+                "total_income": float,
+                "total_expenses": float,
+                "net_cash_flow": float,
+                "transaction_count": int,
+                "financial_health_score": float (0-100)
+            },
+            "transaction_categories": [
+                {"category": "string", "amount": float, "count": int, "percentage": float}
+            ],
+            "spending_patterns": [
+                {"pattern_type": "string", "description": "string", "frequency": "string", "average_amount": float, "confidence_score": float (0-1)}
+            ],
+            "income_analysis": null,
+            "cash_flow_analysis": null,
+            "anomalies": [],
+            "insights": [],
+            "recommendations": [],
+            "risk_assessment": null,
+            "detailed_analysis": "string (summary of 50-100 words)"
+        }
+        """
+
+_RISK_PROMPT = """
+        You are a professional financial risk analyst. Assess the financial risk shown by the uploaded bank statement.
+        Sensitive personal information has been sanitized and replaced with placeholders.
+        Do NOT reproduce account numbers, names, addresses, phone numbers, emails or any other
+        personally identifiable information.
+        
+        1. DOCUMENT STRUCTURE: bank name, account type, statement period, opening and closing balances.
+        2. CASH FLOW: net cash flow, balance lows and highs, volatility and trend.
+        3. ANOMALIES: unusually large, duplicate or suspicious transactions and potential fraud indicators.
+        4. FINANCIAL HEALTH: rate overall financial health on a scale of 1-100.
+        5. RISK ASSESSMENT: overdraft and low-balance risk, stability and an overall risk rating.
+        
+        Base the analysis ONLY on data visible in the document; use null for anything you cannot determine.
+        
+        Respond with a valid JSON object with exactly this structure:
+        {
+            "document_info": {
+                "bank_name": "string or null",
+                "account_type": "string or null",
+                "statement_period_start": "YYYY-MM-DD or null",
+                "statement_period_end": "YYYY-MM-DD or null",
+                "opening_balance": float or null,
+                "closing_balance": float or null
+            },
+            "summary": {
+                "total_income": float,
+                "total_expenses": float,
+                "net_cash_flow": float,
+                "transaction_count": int,
+                "financial_health_score": float (0-100)
+            },
+            "transaction_categories": [],
+            "spending_patterns": [],
+            "income_analysis": null,
+            "cash_flow_analysis": {
+                "average_daily_balance": float,
+                "lowest_balance": float,
+                "highest_balance": float,
+                "balance_volatility": "low|medium|high",
+                "cash_flow_trend": "improving|stable|declining"
+            },
+            "anomalies": [
+                {"transaction_date": "YYYY-MM-DD", "description": "string", "amount": float, "severity": "low|medium|high", "category": "string", "reason": "string", "confidence_score": float (0-1)}
+            ],
+            "insights": [],
+            "recommendations": [],
+            "risk_assessment": {
+                "overall_risk": "low|medium|high",
+                "risk_factors": ["string"],
+                "risk_score": float (0-100),
+                "financial_stability": "stable|moderate|unstable",
+                "recommendations": ["string"]
+            },
+            "detailed_analysis": "string (risk summary of 100-200 words)"
+        }
+        """
+
+# Seconds to send the prompt inline after a failed cache creation before retrying
+PROMPT_CACHE_RETRY_SECONDS = 300
+
+_PROMPTS = {
+    "comprehensive": _ANALYSIS_PROMPT,
+    "summary": _SUMMARY_PROMPT,
+    "risk": _RISK_PROMPT,
+}
+
+
+class AIAnalysisService(LoggerMixin):
+    """Service for AI-powered financial analysis using Google Gemini with direct file upload"""
+    
+    def __init__(self):
+        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        self._prompt_cache_name: Optional[str] = None
+        self._prompt_cache_expires_at: float = 0.0
+        # Worker threads share this service; only one of them creates the cache
+        self._prompt_cache_lock = threading.Lock()
+
+    def _warm_cache(self) -> Optional[str]:
+        """Create a Gemini context cache holding the static analysis prompt"""
+        try:
+            ttl = settings.GEMINI_CACHE_TTL_SECONDS
+            cache = self.client.caches.create(
+                model=settings.GEMINI_MODEL,
+                config=types.CreateCachedContentConfig(
+                    display_name="intellibank-analysis-prompt",
+                    contents=[self._create_analysis_prompt()],
+                    ttl=f"{ttl}s"
+                )
+            )
+            self._prompt_cache_name = cache.name
+            # Stop using the cache a minute early so requests never race its expiry
+            self._prompt_cache_expires_at = time.monotonic() + max(ttl - 60, 0)
+            self.log_operation("gemini_cache_warmed", cache_name=cache.name, ttl=ttl)
+        except Exception as e:
+            self.log_error(e, "warm_gemini_cache")
+            self._prompt_cache_name = None
+            # Send the prompt inline for a while, then try creating the cache again
+            self._prompt_cache_expires_at = time.monotonic() + PROMPT_CACHE_RETRY_SECONDS
+        return self._prompt_cache_name
+
+    def _get_prompt_cache(self) -> Optional[str]:
+        """Return the live prompt cache name, creating it on first use or once it has expired"""
+        if time.monotonic() < self._prompt_cache_expires_at:
+            return self._prompt_cache_name
+        with self._prompt_cache_lock:
+            # Another thread may have created the cache while this one waited
+            if time.monotonic() < self._prompt_cache_expires_at:
+                return self._prompt_cache_name
+            return self._warm_cache()
         
-        return prompt
+    def _create_analysis_prompt(self, analysis_type: str = "comprehensive") -> str:
+        """Create the analysis prompt for the given analysis type"""
+        return _PROMPTS.get(analysis_type, _ANALYSIS_PROMPT)
     
+    async def _upload_document(self, file_content: bytes, filename: str) -> types.File:
+        """Upload a PDF to the Gemini Files API and wait until it is ready"""
+        self.log_operation("uploading_file_to_gemini", filename=filename)
+        uploaded_file = await asyncio.to_thread(
+            self.client.files.upload,
+            file=io.BytesIO(file_content),
+            config=types.UploadFileConfig(mime_type="application/pdf", display_name=filename)
+        )
+
+        # Most files finish processing in well under a second, so start polling fast
+        poll_delay = 0.2
+        while uploaded_file.state.name == "PROCESSING":
+            self.log_operation("waiting_for_file_processing", poll_delay=poll_delay)
+            await asyncio.sleep(poll_delay)
+            poll_delay = min(poll_delay * 2, 2.0)
+            uploaded_file = await asyncio.to_thread(self.client.files.get, name=uploaded_file.name)
+        
+        if uploaded_file.state.name == "FAILED":
+            raise ExternalServiceError("File processing failed in Gemini")
+        return uploaded_file
+
     async def analyze_financial_document(
         self, 
         file_content: bytes, 
         filename: str,
         analysis_type: str = "comprehensive",
-        sanitization_config: SanitizationConfig = None
+        sanitization_config: SanitizationConfig = None,
+        text_content: Optional[str] = None
     ) -> Dict[str, Any]:
         """Perform comprehensive financial analysis using direct file upload to Gemini"""
         try:
             self.log_operation("ai_analysis_start", filename=filename, analysis_type=analysis_type)
+            # Fail before uploading anything while Gemini is known to be unavailable
+            gemini_limiter.check_circuit()
 
             # sanitizer = BankStatementSanitizer(sanitization_config)
             #
@@ -443,95 +646,94 @@ class AIAnalysisService(LoggerMixin):
             # self.log_operation("sanitization_complete",
             #                    replacements_made=replacement_count)
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                temp_file.write(file_content)
-                temp_file.flush()
-                
+            uploaded_file = None
+            if text_content:
+                # Born-digital statements go in as text, skipping per-page vision tokens
+                document = f"Bank statement text extracted from {filename}:\n\n{text_content}"
+            else:
+                document = await self._upload_document(file_content, filename)
+                uploaded_file = document
+
+            prompt = self._create_analysis_prompt(analysis_type)
+            # Only the comprehensive prompt is held in the Gemini context cache
+            prompt_cache = (
+                await asyncio.to_thread(self._get_prompt_cache)
+                if prompt is _ANALYSIS_PROMPT else None
+            )
+
+            self.log_operation("generating_analysis_with_gemini", prompt_cached=bool(prompt_cache))
+            if prompt_cache:
+                contents = [document]
+                config = types.GenerateContentConfig(cached_content=prompt_cache)
+            else:
+                contents = [document, prompt]
+                config = None
+
+            async with gemini_limiter:
                 try:
-                    self.log_operation("uploading_file_to_gemini", filename=filename)
-                    uploaded_file = self.client.files.upload(
-                        file=temp_file.name,
-
+                    response = await asyncio.to_thread(
+                        self.client.models.generate_content,
+                        model=settings.GEMINI_MODEL,
+                        contents=contents,
+                        config=config
                     )
+                except genai_errors.APIError as e:
+                    gemini_limiter.record_response(e.code, getattr(e.response, "headers", None))
+                    raise
+                except (httpx.TransportError, TimeoutError, ConnectionError):
+                    # Timeouts and dropped connections signal an outage as much as 5xx do
+                    gemini_limiter.record_transport_error()
+                    raise
+                gemini_limiter.record_response(200)
+
+            if not response or len(response.strip()) == 0:
+                raise ExternalServiceError("Gemini returned empty content.")
+
+            if hasattr(response, 'text'):
+                 response_text = response.text
+            elif hasattr(response, 'candidates') and response.candidates:
+                response_text = response.candidates[0].content.parts[0].text
+            else:
+                raise ExternalServiceError("No text content in Gemini response")
+            
+            if not response_text:
+                raise ExternalServiceError("Empty response from Gemini")
 
-                    import time
-                    while uploaded_file.state.name == "PROCESSING":
-                        self.log_operation("waiting_for_file_processing")
-                        time.sleep(2)
-                        uploaded_file = self.client.files.get(uploaded_file.name)
-                    
-                    if uploaded_file.state.name == "FAILED":
-                        raise ExternalServiceError("File processing failed in Gemini")
+            # Clean the response text to extract JSON, removing markdown code fences if present
+            fenced = _FENCE_RE.match(response_text)
+            response_text = fenced.group(1) if fenced else response_text.strip()
 
-                    prompt = self._create_analysis_prompt(analysis_type)
-                    
 
-                    self.log_operation("generating_analysis_with_gemini")
-                    response = self.client.models.generate_content(
-                        model=settings.GEMINI_MODEL,
-                        contents=[
-                        uploaded_file,
-                        prompt
-                    ])
-
-                    if not response or len(response.strip()) == 0:
-                        raise ExternalServiceError("Gemini returned empty content.")
-
-                    if hasattr(response, 'text'):
-                         response_text = response.text
-                    elif hasattr(response, 'candidates') and response.candidates:
-                        response_text = response.candidates[0].content.parts[0].text
-                    else:
-                        raise ExternalServiceError("No text content in Gemini response")
-                    
-                    if not response_text:
-                        raise ExternalServiceError("Empty response from Gemini")
-
-                    # Clean the response text to extract JSON
-                    response_text = response_text.strip()
-
-                    # Remove markdown code blocks if present
-                    if response_text.startswith('```json'):
-                        response_text = response_text[7:]  # Remove ```json
-                    if response_text.startswith('```'):
-                        response_text = response_text[3:]   # Remove ```
-                    if response_text.endswith('```'):
-                        response_text = response_text[:-3]  # Remove trailing ```
-
-
-                    try:
-                        analysis_result = json.loads(response_text)
-                        # print("Analysis result type:", type(analysis_result))
-                        # print("Analysis result keys:", analysis_result.keys() if isinstance(analysis_result, dict) else "Not a dict")
-                        # print(analysis_result)
-                        self.log_operation("analysis_parsing_successful")
-                    except json.JSONDecodeError as e:
-                        self.log_error(e, "gemini-response-error", response_text=response.text)
-                        raise ExternalServiceError("Invalid JSON returned from Gemini")
-
-
-                    try:
-                        self.client.files.delete(name=uploaded_file.name)
-                        self.log_operation("gemini_file_cleanup_successful")
-                    except Exception as e:
-                        self.log_error(e, "gemini_file_cleanup_failed")
-                    
-                    self.log_operation("ai_analysis_complete", analysis_type=analysis_type)
-                    return analysis_result
-                    
-                finally:
-                    try:
-                        os.unlink(temp_file.name)
-                    except Exception as e:
-                        self.log_error(e, "temp_file_cleanup_failed")
-                        
+            try:
+                analysis_result = orjson.loads(response_text)
+                # print("Analysis result type:", type(analysis_result))
+                # print("Analysis result keys:", analysis_result.keys() if isinstance(analysis_result, dict) else "Not a dict")
+                # print(analysis_result)
+                self.log_operation("analysis_parsing_successful")
+            except orjson.JSONDecodeError as e:
+                self.log_error(e, "gemini-response-error", response_text=response.text)
+                raise ExternalServiceError("Invalid JSON returned from Gemini")
+
+
+            if uploaded_file is not None:
+                try:
+                    await asyncio.to_thread(self.client.files.delete, name=uploaded_file.name)
+                    self.log_operation("gemini_file_cleanup_successful")
+                except Exception as e:
+                    self.log_error(e, "gemini_file_cleanup_failed")
+            
+            self.log_operation("ai_analysis_complete", analysis_type=analysis_type)
+            return analysis_result
+
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             self.log_error(error=e, operation="analyze_financial_document", filename=filename)
 
             return None
             # Return fallback analysis instead of failing
             # return self._create_fallback_analysis(filename)
-    
+
     # def _validate_and_enhance_analysis(self, analysis: Dict[str, Any], filename: str) -> Dict[str, Any]:
     #     """Validate and enhance AI analysis results"""
     #     try:
@@ -1,18 +1,42 @@
 """Analysis service for managing financial analysis operations"""
+import asyncio
+import hashlib
+import time
 from fastapi import HTTPException
 from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, func, insert, text, update
 from starlette import status
+from pydantic import ValidationError as SchemaValidationError
 from app.models.analysis import Analysis
 from app.models.statement import Statement, StatementStatus
-from app.schemas.analysis import AnalysisCreate, AnalysisListParams
+from app.schemas.analysis import AnalysisCreate, AnalysisListParams, AnalysisSummary, DocumentInfo
 from app.services.base import BaseService
 from app.services.file_service import file_service
+from app.services.statement_service import statement_service
 from app.services.ai_service import ai_service
-from app.core.exceptions import ValidationError, FileProcessingError
-import json
-from datetime import datetime
+from app.services.cache_service import cache_service
+from app.core.config import settings
+from app.core.exceptions import ValidationError, FileProcessingError, ServiceUnavailableError
+import orjson
+from datetime import datetime, timedelta, timezone
+
+
+_RECENT_WINDOW = timedelta(days=30)
+
+_TOP_CATEGORIES_SQL = text("""
+    SELECT elem->>'category' AS category,
+           SUM(COALESCE((elem->>'count')::numeric, 0)) AS total
+    FROM analyses
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(transaction_categories) = 'array'
+             THEN transaction_categories ELSE '[]'::jsonb END
+    ) AS elem
+    WHERE user_id = :user_id AND jsonb_typeof(elem) = 'object' AND elem ? 'category'
+    GROUP BY elem->>'category'
+    ORDER BY total DESC
+    LIMIT 5
+""")
 
 
 class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
@@ -44,85 +68,121 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
                 raise ValidationError("Statement must be in uploaded status for analysis")
             
 
-            from app.services.statement_service import statement_service
-            statement_service.update_processing_status(
-                db, statement_id, StatementStatus.PROCESSING
-            )
-            
+            # Copy out what the AI call needs: the download task below starts
+            # before the status commit, so it needs these fields up front
+            cloudinary_public_id = statement.cloudinary_public_id
+            cloudinary_url = statement.cloudinary_url
+            original_filename = statement.original_filename
 
-            pdf_content = await file_service.download_from_cloudinary(
-                statement.cloudinary_public_id
+            # Start the download now so it overlaps the status commit below
+            download_task = asyncio.create_task(
+                file_service.download_from_cloudinary(cloudinary_public_id, cloudinary_url)
             )
 
+            statement.status = StatementStatus.PROCESSING
+            statement.processing_started_at = datetime.utcnow()
+            try:
+                # Commit in a thread: a blocking commit would stall the download too
+                await asyncio.to_thread(db.commit)
+            except Exception:
+                download_task.cancel()
+                raise
+
 
-            start_time = datetime.utcnow()
-            self.log_operation("create_analysis", statement_id=statement_id, user_id=user_id)
-            analysis_result = await ai_service.analyze_financial_document(
-                pdf_content, 
-                statement.original_filename,
-                analysis_type
+            pdf_content = await download_task
+            # Identical uploads reuse the earlier Gemini result instead of paying for a new call
+            cache_key = f"analysis:{hashlib.blake2b(pdf_content, digest_size=16).hexdigest()}:{analysis_type}"
+            cached_result = await cache_service.get(cache_key)
+
+
+            start_time = time.perf_counter()
+            self.log_operation(
+                "create_analysis", statement_id=statement_id, user_id=user_id, cache_hit=bool(cached_result)
             )
+            if cached_result:
+                analysis_result = orjson.loads(cached_result)
+            else:
+                # Extraction is CPU-bound, so keep it off the event loop
+                text_content = await asyncio.to_thread(file_service.extract_text_fast, pdf_content)
+                analysis_result = await ai_service.analyze_financial_document(
+                    pdf_content, 
+                    original_filename,
+                    analysis_type,
+                    text_content=text_content
+                )
 
             if not isinstance(analysis_result, dict):
                 raise ValidationError("AI service returned unexpected data type")
 
 
-            end_time = datetime.now()
-            processing_time = (end_time - start_time).total_seconds()
+            processing_time = time.perf_counter() - start_time
 
-            document_info = analysis_result["document_info"]
+            try:
+                summary = AnalysisSummary.model_validate(analysis_result["summary"])
+                document_info = DocumentInfo.model_validate(analysis_result["document_info"])
+            except (KeyError, SchemaValidationError) as e:
+                raise ValidationError(f"AI analysis result is malformed: {e}")
+
+            if not cached_result:
+                await cache_service.set(
+                    cache_key, orjson.dumps(analysis_result), ttl=settings.ANALYSIS_CACHE_TTL_SECONDS
+                )
 
-            analysis = Analysis(
+            analysis_values = dict(
                 statement_id=statement_id,
                 user_id=user_id,
                 analysis_type=analysis_type,
                 model_version="gemini-2.0-flash",
                 processing_time_seconds=processing_time,
                 # Financial summary
-                total_income=analysis_result["summary"]["total_income"],
-                total_expenses=analysis_result["summary"]["total_expenses"],
-                net_cash_flow=analysis_result["summary"]["net_cash_flow"],
-                opening_balance=document_info["opening_balance"],
-                closing_balance=document_info["closing_balance"],
-                financial_health_score=analysis_result["summary"]["financial_health_score"],
-                # Analysis results as JSON
-                transaction_categories=json.dumps(analysis_result["transaction_categories"]),
-                spending_patterns=json.dumps(analysis_result["spending_patterns"]),
-                income_analysis=json.dumps(analysis_result["income_analysis"]),
-                anomalies=json.dumps(analysis_result["anomalies"]),
-                insights=json.dumps(analysis_result["insights"]),
-                recommendations=json.dumps(analysis_result["recommendations"]),
-                risk_assessment=json.dumps(analysis_result["risk_assessment"]),
+                total_income=summary.total_income,
+                total_expenses=summary.total_expenses,
+                net_cash_flow=summary.net_cash_flow,
+                opening_balance=document_info.opening_balance,
+                closing_balance=document_info.closing_balance,
+                financial_health_score=summary.financial_health_score,
+                # Analysis results as JSONB
+                transaction_categories=analysis_result["transaction_categories"],
+                spending_patterns=analysis_result["spending_patterns"],
+                income_analysis=analysis_result["income_analysis"],
+                anomalies=analysis_result["anomalies"],
+                insights=analysis_result["insights"],
+                recommendations=analysis_result["recommendations"],
+                risk_assessment=analysis_result["risk_assessment"],
                 # Raw data - store the complete analysis result
-                transactions_data=json.dumps(analysis_result["cash_flow_analysis"]),
-                excel_data_summary=json.dumps(document_info),
+                transactions_data=analysis_result["cash_flow_analysis"],
+                excel_data_summary=analysis_result["document_info"],
                 # AI-generated content
                 summary_text=self._generate_summary_text(analysis_result),
                 detailed_analysis=analysis_result["detailed_analysis"],
             )
 
-            print(analysis)
-
-            db.add(analysis)
+            statement_values = {
+                "status": StatementStatus.COMPLETED,
+                "processing_completed_at": datetime.utcnow()
+            }
+            if document_info.statement_period_start:
+                statement_values["statement_period_start"] = document_info.statement_period_start
+            if document_info.statement_period_end:
+                statement_values["statement_period_end"] = document_info.statement_period_end
+            if document_info.bank_name:
+                statement_values["bank_name"] = document_info.bank_name
+            if document_info.account_type:
+                statement_values["account_type"] = document_info.account_type
+
+            # Analysis insert, statement details and status flip land atomically;
+            # RETURNING hands back the generated columns so no refresh SELECT is needed
+            inserted = db.execute(
+                insert(Analysis).values(**analysis_values).returning(
+                    Analysis.id, Analysis.created_at, Analysis.updated_at, Analysis.is_active
+                )
+            ).one()
+            db.execute(
+                update(Statement).where(Statement.id == statement_id).values(**statement_values)
+            )
             db.commit()
-            db.refresh(analysis)
 
-
-            if document_info["statement_period_start"]:
-                statement.statement_period_start = document_info["statement_period_start"]
-            if document_info["statement_period_end"]:
-                statement.statement_period_end = document_info["statement_period_end"]
-            if document_info["bank_name"]:
-                statement.bank_name = document_info["bank_name"]
-            if document_info["account_type"]:
-                statement.account_type = document_info["account_type"]
-            
-            db.add(statement)
-            
-
-            statement_service.update_processing_status(
-                db, statement_id, StatementStatus.COMPLETED
-            )
+            analysis = Analysis(**analysis_values, **inserted._mapping)
             
             self.log_operation(
                 "create_analysis_process_time",
@@ -134,11 +194,20 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
             
             return analysis
             
+        except ServiceUnavailableError:
+            # Gemini is shedding load: hand the statement back so it can be retried later
+            try:
+                db.rollback()
+                statement_service.update_processing_status(
+                    db, statement_id, StatementStatus.UPLOADED
+                )
+            except:
+                pass
+            raise
         except (ValidationError, FileProcessingError) as e:
 
             try:
-                pass
-                from app.services.statement_service import statement_service
+                db.rollback()
                 statement_service.update_processing_status(
                     db, statement_id, StatementStatus.FAILED, str(e)
                 )
@@ -148,8 +217,7 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
         except Exception as e:
 
             try:
-                pass
-                from app.services.statement_service import statement_service
+                db.rollback()
                 statement_service.update_processing_status(
                     db, statement_id, StatementStatus.FAILED, str(e)
                 )
@@ -186,11 +254,18 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
                 query = query.filter(Analysis.created_at <= params.end_date)
             
 
-            total = query.count()
-            
-
+            # Count rides along with the page rows so pagination costs one round trip
             offset = (params.page - 1) * params.size
-            analyses = query.offset(offset).limit(params.size).all()
+            rows = query.add_columns(func.count().over().label("total")) \
+                .order_by(Analysis.created_at.desc()) \
+                .offset(offset).limit(params.size).all()
+
+            analyses = [analysis for analysis, _ in rows]
+            if rows:
+                total = rows[0].total
+            else:
+                # A page past the end returns no rows, so the window count is unavailable
+                total = query.count() if offset else 0
             
             self.log_operation(
                 "get_user_analyses",
@@ -213,13 +288,11 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
     ) -> Optional[Analysis]:
         """Get analysis with related statement data"""
         try:
-            analysis = db.query(Analysis).filter(
+            analysis = db.query(Analysis).options(
+                joinedload(Analysis.statement)
+            ).filter(
                 and_(Analysis.id == analysis_id, Analysis.user_id == user_id)
             ).first()
-            
-            if analysis:
-                # Load related statement
-                db.refresh(analysis)
                 
             return analysis
             
@@ -230,10 +303,18 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
     def get_analysis_stats(self, db: Session, user_id: int) -> Dict[str, Any]:
         """Get analysis statistics for user"""
         try:
-            total_analyses = db.query(Analysis).filter(
-                Analysis.user_id == user_id
-            ).count()
-            
+            # Recent insights count (last 30 days)
+            # created_at is stored as naive UTC, so compare against naive UTC
+            thirty_days_ago = datetime.now(timezone.utc).replace(tzinfo=None) - _RECENT_WINDOW
+
+            # Totals, averages and the recent count come back in a single scan
+            total_analyses, avg_processing_time, avg_health_score, recent_insights_count = db.query(
+                func.count(Analysis.id),
+                func.avg(Analysis.processing_time_seconds),
+                func.avg(Analysis.financial_health_score),
+                func.count(Analysis.id).filter(Analysis.created_at >= thirty_days_ago)
+            ).filter(Analysis.user_id == user_id).one()
+
             if total_analyses == 0:
                 return {
                     "total_analyses": 0,
@@ -242,72 +323,21 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
                     "most_common_categories": [],
                     "recent_insights_count": 0
                 }
-            
-
-            avg_processing_time = db.query(
-                func.avg(Analysis.processing_time_seconds)
-            ).filter(Analysis.user_id == user_id).scalar() or 0
-            
-
-            avg_health_score = db.query(
-                func.avg(Analysis.financial_health_score)
-            ).filter(
-                and_(
-                    Analysis.user_id == user_id,
-                    Analysis.financial_health_score.isnot(None)
-                )
-            ).scalar() or 0
 
 
-            # Get analyses with transaction categories
-            analyses_with_categories = db.query(Analysis.transaction_categories) \
-                .filter(
-                and_(
-                    Analysis.user_id == user_id,
-                    Analysis.transaction_categories.isnot(None)
-                )
+            # Get top 5 categories by transaction count, aggregated in Postgres
+            top_categories = db.execute(
+                _TOP_CATEGORIES_SQL, {"user_id": user_id}
             ).all()
-
-
-            category_totals = {}
-            for (categories_json,) in analyses_with_categories:
-                if categories_json:
-                    try:
-                        categories = json.loads(categories_json)
-                        if isinstance(categories, list):
-                            for category in categories:
-                                if isinstance(category, dict) and 'category' in category:
-                                    cat_name = category['category']
-                                    cat_count = category.get('count', 0)
-
-                                    category_totals[cat_name] = category_totals.get(cat_name, 0) + cat_count
-
-                    except (json.JSONDecodeError, TypeError):
-                        continue
-
-            # Get top 5 categories by transaction count
-            sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)[:5]
             most_common_categories = [
-                {"category": cat, "count": count}
-                for cat, count in sorted_categories
+                {"category": category, "count": int(count)}
+                for category, count in top_categories
             ]
 
-
-
-            # Recent insights count (last 30 days)
-            from datetime import timedelta
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            recent_insights_count = db.query(Analysis).filter(
-                and_(
-                    Analysis.user_id == user_id,
-                    Analysis.created_at >= thirty_days_ago
-                )
-            ).count()
-            
             stats = {
                 "total_analyses": int(total_analyses),
-                "avg_processing_time": round(avg_processing_time, 2),
-                "avg_financial_health_score": round(avg_health_score, 2),
+                "avg_processing_time": round(avg_processing_time or 0, 2),
+                "avg_financial_health_score": round(avg_health_score or 0, 2),
                 "most_common_categories": most_common_categories,
                 "recent_insights_count": recent_insights_count
             }
@@ -330,32 +360,31 @@ class AnalysisService(BaseService[Analysis, AnalysisCreate, dict]):
             health_score = summary.get("financial_health_score", 0)
             transaction_count = summary.get("transaction_count", 0)
             
-            summary_text = f"""
-            Financial Analysis Summary:
-            
-            Total Income: ${total_income:,.2f}
-            Total Expenses: ${total_expenses:,.2f}
-            Net Cash Flow: ${net_cash_flow:,.2f}
-            Transaction Count: {transaction_count}
-            Financial Health Score: {health_score:.1f}/100
-            
-            """
+            parts = [
+                "Financial Analysis Summary:",
+                "",
+                f"Total Income: ${total_income:,.2f}",
+                f"Total Expenses: ${total_expenses:,.2f}",
+                f"Net Cash Flow: ${net_cash_flow:,.2f}",
+                f"Transaction Count: {transaction_count}",
+                f"Financial Health Score: {health_score:.1f}/100",
+                "",
+            ]
             
             # Add insights summary
             insights = analysis_result.get("insights", [])
             if insights:
-                summary_text += "Key Insights:\n"
-                for insight in insights[:3]:  # Top 3 insights
-                    summary_text += f"• {insight.get('title', 'N/A')}\n"
+                parts.append("Key Insights:")
+                parts.extend(f"• {insight.get('title', 'N/A')}" for insight in insights[:3])  # Top 3 insights
             
             # Add top recommendations
             recommendations = analysis_result.get("recommendations", [])
             if recommendations:
-                summary_text += "\nTop Recommendations:\n"
-                for rec in recommendations[:3]:  # Top 3 recommendations
-                    summary_text += f"• {rec.get('title', 'N/A')}\n"
+                parts.append("")
+                parts.append("Top Recommendations:")
+                parts.extend(f"• {rec.get('title', 'N/A')}" for rec in recommendations[:3])  # Top 3 recommendations
             
-            return summary_text.strip()
+            return "\n".join(parts).strip()
             
         except Exception as e:
             self.log_error(e, "_generate_summary_text")
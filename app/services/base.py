@@ -1,8 +1,10 @@
 """Base service class with common functionality"""
 
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic, Optional, List, Dict, Any
+from typing import TypeVar, Generic, Optional, List, Dict, Any, Tuple
+from sqlalchemy import func, insert, inspect, lambda_stmt, select
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 from app.core.logging import LoggerMixin
 from app.core.exceptions import DatabaseError, ValidationError
 
@@ -16,6 +18,26 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], Logger
     
     def __init__(self, model: ModelType):
         self.model = model
+        # Resolve filterable columns once instead of hasattr/getattr on every call
+        self._columns = {attr.key: getattr(model, attr.key) for attr in inspect(model).column_attrs}
+    
+    def _apply_filters(
+        self,
+        stmt: StatementLambdaElement,
+        filters: Optional[Dict[str, Any]]
+    ) -> StatementLambdaElement:
+        """Apply equality filters for keys that name model columns"""
+        if filters:
+            for key, value in filters.items():
+                column = self._columns.get(key)
+                if column is not None and value is not None:
+                    stmt = self._where_equal(stmt, column, value)
+        return stmt
+    
+    @staticmethod
+    def _where_equal(stmt: StatementLambdaElement, column, value) -> StatementLambdaElement:
+        """Add one equality filter; the column is part of the cache key, the value a bound parameter"""
+        return stmt + (lambda s: s.where(column == value))
     
     def get(self, db: Session, id: int) -> Optional[ModelType]:
         """Get single record by ID"""
@@ -34,27 +56,49 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], Logger
     ) -> List[ModelType]:
         """Get multiple records with pagination and filters"""
         try:
-            query = db.query(self.model)
-            
-            if filters:
-                for key, value in filters.items():
-                    if hasattr(self.model, key) and value is not None:
-                        query = query.filter(getattr(self.model, key) == value)
-            
-            return query.offset(skip).limit(limit).all()
+            # Lambda statements are compiled once per model and filter combination
+            model = self.model
+            stmt = self._apply_filters(lambda_stmt(lambda: select(model)), filters)
+            stmt += lambda s: s.offset(skip).limit(limit)
+            return db.scalars(stmt).all()
         except Exception as e:
             self.log_error(e, "get_multi", skip=skip, limit=limit, filters=filters)
             raise DatabaseError(f"Failed to get {self.model.__name__} records")
     
+    def list_with_total(
+        self, 
+        db: Session, 
+        skip: int = 0, 
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[ModelType], int]:
+        """Get a page of records together with the total count in one round trip"""
+        try:
+            model = self.model
+            stmt = self._apply_filters(
+                lambda_stmt(lambda: select(model, func.count().over().label("total"))), filters
+            )
+            stmt += lambda s: s.offset(skip).limit(limit)
+            rows = db.execute(stmt).all()
+            
+            if rows:
+                return [obj for obj, _ in rows], rows[0].total
+            # A page past the end returns no rows, so the window count is unavailable
+            return [], self.count(db, filters) if skip else 0
+        except Exception as e:
+            self.log_error(e, "list_with_total", skip=skip, limit=limit, filters=filters)
+            raise DatabaseError(f"Failed to get {self.model.__name__} records")
+    
     def create(self, db: Session, obj_in: CreateSchemaType, **kwargs) -> ModelType:
         """Create new record"""
         try:
             obj_data = obj_in.model_dump() if hasattr(obj_in, 'model_dump') else obj_in.dict()
             obj_data.update(kwargs)
-            db_obj = self.model(**obj_data)
-            db.add(db_obj)
+            # RETURNING loads every column, so no refresh SELECT is needed after commit
+            db_obj = db.execute(
+                insert(self.model).values(**obj_data).returning(self.model)
+            ).scalar_one()
             db.commit()
-            db.refresh(db_obj)
             self.log_operation("create", model=self.model.__name__, id=db_obj.id)
             return db_obj
         except Exception as e:
@@ -78,7 +122,6 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], Logger
             
             db.add(db_obj)
             db.commit()
-            db.refresh(db_obj)
             self.log_operation("update", model=self.model.__name__, id=db_obj.id)
             return db_obj
         except Exception as e:
@@ -89,14 +132,14 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], Logger
     def delete(self, db: Session, id: int) -> bool:
         """Soft delete record"""
         try:
-            obj = db.query(self.model).filter(self.model.id == id).first()
-            if obj:
-                obj.is_active = False
-                db.add(obj)
-                db.commit()
+            # Single UPDATE instead of loading the row just to flip one flag
+            rows = db.query(self.model).filter(
+                self.model.id == id, self.model.is_active.is_(True)
+            ).update({self.model.is_active: False}, synchronize_session=False)
+            db.commit()
+            if rows:
                 self.log_operation("delete", model=self.model.__name__, id=id)
-                return True
-            return False
+            return bool(rows)
         except Exception as e:
             db.rollback()
             self.log_error(e, "delete", model=self.model.__name__, id=id)
@@ -105,14 +148,11 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType], Logger
     def count(self, db: Session, filters: Optional[Dict[str, Any]] = None) -> int:
         """Count records with optional filters"""
         try:
-            query = db.query(self.model)
-            
-            if filters:
-                for key, value in filters.items():
-                    if hasattr(self.model, key) and value is not None:
-                        query = query.filter(getattr(self.model, key) == value)
-            
-            return query.count()
+            model = self.model
+            stmt = self._apply_filters(
+                lambda_stmt(lambda: select(func.count()).select_from(model)), filters
+            )
+            return db.scalar(stmt)
         except Exception as e:
             self.log_error(e, "count", filters=filters)
             raise DatabaseError(f"Failed to count {self.model.__name__} records")
\ No newline at end of file
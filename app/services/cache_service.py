@@ -0,0 +1,66 @@
+"""Cache service for reusing expensive results across requests"""
+
+import asyncio
+from typing import Optional
+
+import redis
+from app.core.config import settings
+from app.core.logging import LoggerMixin
+
+
+class CacheService(LoggerMixin):
+    """Redis-backed byte cache and cross-process signals; failures degrade to misses"""
+
+    def __init__(self):
+        # Sync client behind to_thread: Celery tasks each run a fresh event loop,
+        # and redis.asyncio connections are bound to the loop that opened them
+        self.client = redis.from_url(settings.REDIS_URL)
+
+    def get_sync(self, key: str) -> Optional[bytes]:
+        """Get cached value by key from synchronous code"""
+        try:
+            return self.client.get(key)
+        except redis.RedisError as e:
+            self.log_error(e, "cache_get", key=key)
+            return None
+
+    def set_sync(self, key: str, value: bytes, ttl: int) -> None:
+        """Store value under key for ttl seconds from synchronous code"""
+        try:
+            self.client.set(key, value, ex=ttl)
+        except redis.RedisError as e:
+            self.log_error(e, "cache_set", key=key)
+
+    def notify_sync(self, key: str, ttl: int) -> None:
+        """Signal a waiter on key; the signal is kept for ttl seconds if nobody waits yet"""
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.rpush(key, b"1")
+                pipe.expire(key, ttl)
+                pipe.execute()
+        except redis.RedisError as e:
+            self.log_error(e, "cache_notify", key=key)
+
+    def wait_sync(self, key: str, timeout: int) -> bool:
+        """Block until key is signalled or timeout seconds pass; True when signalled"""
+        try:
+            return self.client.blpop([key], timeout=timeout) is not None
+        except redis.RedisError as e:
+            self.log_error(e, "cache_wait", key=key)
+            return False
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get cached value by key"""
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        """Store value under key for ttl seconds"""
+        await asyncio.to_thread(self.set_sync, key, value, ttl)
+
+    async def wait(self, key: str, timeout: int) -> bool:
+        """Wait until key is signalled or timeout seconds pass; True when signalled"""
+        return await asyncio.to_thread(self.wait_sync, key, timeout)
+
+
+# Create service instance
+cache_service = CacheService()
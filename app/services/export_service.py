@@ -1,14 +1,20 @@
 """Export service for generating reports in various formats"""
 
 import io
-import csv
-import json
+import hashlib
 import tempfile
 import os
-from typing import Dict, List, Any, Optional, Union
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
 from datetime import datetime, date
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session, joinedload
+from sqlalchemy import and_, case, column, func, literal_column, or_, true
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Row
 import pandas as pd
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
@@ -19,27 +25,202 @@ from reportlab.graphics.shapes import Drawing
 from reportlab.graphics.charts.linecharts import HorizontalLineChart
 from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.charts.barcharts import VerticalBarChart
+import matplotlib
+matplotlib.use('Agg')
+matplotlib.rcParams['path.simplify'] = True
+matplotlib.rcParams['agg.path.chunksize'] = 10000
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 import seaborn as sns
+from cycler import cycler
 from PIL import Image as PILImage
 import base64
+import orjson
 
 from app.models.analysis import Analysis
 from app.models.statement import Statement
+from app.core.config import settings
 from app.core.logging import LoggerMixin
 from app.core.exceptions import ValidationError, FileProcessingError
+from app.services.cache_service import cache_service
+
+# Export format -> (content type, file extension)
+EXPORT_FILE_TYPES = {
+    'pdf': ('application/pdf', 'pdf'),
+    'csv': ('text/csv', 'csv'),
+    'excel': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'json': ('application/json', 'json'),
+    'png': ('image/png', 'png')
+}
+
+STREAM_BATCH_SIZE = 1000
+CSV_CHUNK_ROWS = 10_000
+
+# CSV export: row field -> column header, in output order
+_CSV_HEADERS = {
+    'id': 'Analysis ID',
+    'original_filename': 'Statement Filename',
+    'analysis_type': 'Analysis Type',
+    'created_at': 'Date Created',
+    'processing_time_seconds': 'Processing Time (seconds)',
+    'financial_health_score': 'Financial Health Score',
+    'total_income': 'Total Income',
+    'total_expenses': 'Total Expenses',
+    'net_cash_flow': 'Net Cash Flow',
+    'opening_balance': 'Opening Balance',
+    'closing_balance': 'Closing Balance',
+    'summary_text': 'Summary Text'
+}
+_CSV_NUMERIC_COLUMNS = [
+    'processing_time_seconds', 'financial_health_score', 'total_income', 'total_expenses',
+    'net_cash_flow', 'opening_balance', 'closing_balance'
+]
+
+# Excel detail sheets: header -> (JSON key, default) for each element of the JSONB array
+_INSIGHT_FIELDS = {
+    'Insight Type': ('type', 'N/A'),
+    'Title': ('title', 'N/A'),
+    'Description': ('description', 'N/A'),
+    'Impact': ('impact', 'N/A'),
+    'Priority': ('priority', 'N/A')
+}
+_RECOMMENDATION_FIELDS = {
+    'Category': ('category', 'N/A'),
+    'Title': ('title', 'N/A'),
+    'Description': ('description', 'N/A'),
+    'Potential Savings': ('potential_savings', '0'),
+    'Difficulty': ('difficulty', 'N/A'),
+    'Timeframe': ('timeframe', 'N/A')
+}
+
+# Formats that only read scalar columns are fetched as plain rows instead of ORM objects
+_EXPORT_COLUMNS = {
+    'csv': (
+        Analysis.id, Analysis.analysis_type, Analysis.created_at, Analysis.processing_time_seconds,
+        Analysis.financial_health_score, Analysis.total_income, Analysis.total_expenses,
+        Analysis.net_cash_flow, Analysis.opening_balance, Analysis.closing_balance,
+        Analysis.summary_text
+    ),
+    'png': (
+        Analysis.created_at, Analysis.financial_health_score, Analysis.total_income,
+        Analysis.total_expenses, Analysis.analysis_type
+    )
+}
+
+# A couple of spawned renderers per API worker; spawn, not fork, because the API
+# process runs threads (threadpool, log listener) that a forked child would inherit
+CHART_WORKERS = 2
+_chart_executor: Optional[ProcessPoolExecutor] = None
+_chart_executor_lock = threading.Lock()
+
+
+def _get_chart_executor() -> ProcessPoolExecutor:
+    """Return the shared chart pool, creating it on first use"""
+    global _chart_executor
+    with _chart_executor_lock:
+        if _chart_executor is None:
+            _chart_executor = ProcessPoolExecutor(
+                max_workers=CHART_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _chart_executor
+
+
+def _reset_chart_executor(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died so the next render starts a fresh one"""
+    global _chart_executor
+    with _chart_executor_lock:
+        if _chart_executor is broken:
+            _chart_executor = None
+    broken.shutdown(wait=False)
+
+# Resolved once at import and applied per render, leaving global rcParams untouched
+_CHART_STYLE = {
+    **plt.style.library['seaborn-v0_8'],
+    'axes.prop_cycle': cycler(color=sns.color_palette('husl'))
+}
+
+
+def _render_dashboard_png(
+        dates: List[datetime],
+        health_scores: List[float],
+        incomes: List[float],
+        expenses: List[float],
+        analysis_types: List[str]
+) -> bytes:
+    """Render the four-panel dashboard; runs in a chart worker process"""
+
+    with plt.rc_context(_CHART_STYLE):
+        # Create a figure with multiple subplots
+        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+        fig.suptitle('Financial Analysis Dashboard', fontsize=20, fontweight='bold')
+
+        # Chart 1: Financial Health Score Trend
+        ax1.plot(dates, health_scores, marker='o', linewidth=2, markersize=6)
+        ax1.set_title('Financial Health Score Trend', fontsize=14, fontweight='bold')
+        ax1.set_ylabel('Health Score')
+        ax1.grid(True, alpha=0.3)
+        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        ax1.tick_params(axis='x', rotation=45)
+
+        # Chart 2: Income vs Expenses
+        width = 0.35
+        x = range(len(dates))
+        ax2.bar([i - width/2 for i in x], incomes, width, label='Income', alpha=0.8)
+        ax2.bar([i + width/2 for i in x], expenses, width, label='Expenses', alpha=0.8)
+        ax2.set_title('Income vs Expenses Comparison', fontsize=14, fontweight='bold')
+        ax2.set_ylabel('Amount ($)')
+        ax2.set_xlabel('Analysis')
+        ax2.legend()
+        ax2.grid(True, alpha=0.3)
+
+        # Chart 3: Net Cash Flow
+        net_flows = [inc - exp for inc, exp in zip(incomes, expenses)]
+        colors_flow = ['green' if nf >= 0 else 'red' for nf in net_flows]
+        ax3.bar(x, net_flows, color=colors_flow, alpha=0.7)
+        ax3.set_title('Net Cash Flow by Analysis', fontsize=14, fontweight='bold')
+        ax3.set_ylabel('Net Cash Flow ($)')
+        ax3.set_xlabel('Analysis')
+        ax3.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+        ax3.grid(True, alpha=0.3)
+
+        # Chart 4: Analysis Type Distribution
+        type_counts = pd.Series(analysis_types).value_counts()
+        ax4.pie(type_counts.values, labels=type_counts.index, autopct='%1.1f%%', startangle=90)
+        ax4.set_title('Analysis Type Distribution', fontsize=14, fontweight='bold')
+
+        plt.tight_layout()
+
+        # Save to buffer
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+        plt.close(fig)
+
+    return buffer.getvalue()
+
+
+def _render_summary_chart_png(dates: List[datetime], health_scores: List[float]) -> bytes:
+    """Render the PDF health score trend chart; runs in a chart worker process"""
+
+    with plt.rc_context(_CHART_STYLE):
+        fig, ax = plt.subplots(figsize=(8, 4))
+
+        ax.plot(dates, health_scores, marker='o', linewidth=2)
+        ax.set_title('Financial Health Score Trend')
+        ax.set_ylabel('Health Score')
+        ax.grid(True, alpha=0.3)
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
+        plt.close(fig)
+
+    return buffer.getvalue()
 
 
 class ExportService(LoggerMixin):
     """Service for exporting analysis data in various formats"""
 
-    def __init__(self):
-        # Set matplotlib style
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
-
     def export_analysis_data(
             self,
             db: Session,
@@ -50,7 +231,7 @@ class ExportService(LoggerMixin):
             statement_ids: Optional[List[int]] = None,
             analysis_types: Optional[List[str]] = None,
             include_charts: bool = True
-    ) -> bytes:
+    ) -> Union[bytes, Iterator[bytes]]:
         """
         Export analysis data in specified format
 
@@ -65,35 +246,102 @@ class ExportService(LoggerMixin):
             include_charts: Whether to include charts in export
 
         Returns:
-            bytes: Exported data
+            Exported data; CSV is returned as an iterator of encoded chunks
         """
         try:
             # Get filtered analysis data
-            analyses = self._get_filtered_analyses(
-                db, user_id, start_date, end_date, statement_ids, analysis_types
+            query = self._get_filtered_analyses(
+                db, user_id, start_date, end_date, statement_ids, analysis_types,
+                columns=_EXPORT_COLUMNS.get(export_format.lower())
             )
 
-            if not analyses:
+            # CSV is written in a single pass, so stream rows through a server-side cursor
+            if export_format.lower() == 'csv':
+                chunks = self._export_to_csv(query.yield_per(STREAM_BATCH_SIZE))
+                # Pull the first chunk now so an empty export fails before streaming starts
+                first_chunk = next(chunks)
+                return chain((first_chunk,), chunks)
+
+            # Key rendered exports on the filters plus the row count and latest update,
+            # so adding, changing or deleting an analysis invalidates the cached file;
+            # the same aggregate query supplies the PDF summary totals
+            stats = self._get_summary_stats(query)
+            if not stats['total_analyses']:
                 raise ValidationError("No analysis data found for the specified criteria")
 
+            cache_key = self._export_cache_key(
+                user_id, export_format, start_date, end_date, statement_ids,
+                analysis_types, include_charts, stats['total_analyses'], stats['last_updated']
+            )
+            cached = cache_service.get_sync(cache_key)
+            if cached is not None:
+                self.log_operation("export_cache_hit", user_id=user_id, format=export_format)
+                return cached
+
+            if export_format.lower() not in _EXPORT_COLUMNS:
+                # Every full export reads statement.original_filename, so join it in up front
+                query = query.options(joinedload(Analysis.statement))
+            analyses = query.all()
+
             # Export based on format
             if export_format.lower() == 'pdf':
-                return self._export_to_pdf(analyses, include_charts)
-            elif export_format.lower() == 'csv':
-                return self._export_to_csv(analyses)
+                exported = self._export_to_pdf(analyses, stats, include_charts)
             elif export_format.lower() == 'excel':
-                return self._export_to_excel(analyses, include_charts)
+                exported = self._export_to_excel(analyses, query, include_charts)
             elif export_format.lower() == 'json':
-                return self._export_to_json(analyses)
+                exported = self._export_to_json(analyses)
             elif export_format.lower() == 'png':
-                return self._export_charts_to_image(analyses)
+                exported = self._export_charts_to_image(analyses)
             else:
                 raise ValidationError(f"Unsupported export format: {export_format}")
 
+            cache_service.set_sync(cache_key, exported, settings.EXPORT_CACHE_TTL_SECONDS)
+            return exported
+
         except Exception as e:
             self.log_error(e, "export_analysis_data", user_id=user_id, format=export_format)
             raise FileProcessingError(f"Failed to export data: {str(e)}")
 
+    @staticmethod
+    def _get_summary_stats(query: Query) -> Dict[str, Any]:
+        """Aggregate report totals and the cache fingerprint in one query"""
+        row = query.order_by(None).with_entities(
+            func.count(),
+            func.max(Analysis.updated_at),
+            func.avg(func.coalesce(Analysis.financial_health_score, 0)),
+            func.coalesce(func.sum(Analysis.total_income), 0),
+            func.coalesce(func.sum(Analysis.total_expenses), 0)
+        ).one()
+        total, last_updated, avg_health_score, total_income, total_expenses = row
+
+        return {
+            'total_analyses': total,
+            'last_updated': last_updated,
+            'avg_health_score': float(avg_health_score or 0),
+            'total_income': float(total_income),
+            'total_expenses': float(total_expenses)
+        }
+
+    @staticmethod
+    def _export_cache_key(
+            user_id: int,
+            export_format: str,
+            start_date: Optional[date],
+            end_date: Optional[date],
+            statement_ids: Optional[List[int]],
+            analysis_types: Optional[List[str]],
+            include_charts: bool,
+            row_count: int,
+            last_updated: Optional[datetime]
+    ) -> str:
+        """Build the cache key for a rendered export"""
+        fingerprint = "|".join(str(part) for part in (
+            user_id, export_format.lower(), start_date, end_date,
+            sorted(statement_ids or []), sorted(analysis_types or []),
+            include_charts, row_count, last_updated
+        ))
+        return f"export:{user_id}:{hashlib.sha256(fingerprint.encode()).hexdigest()}"
+
     def _get_filtered_analyses(
             self,
             db: Session,
@@ -101,11 +349,16 @@ class ExportService(LoggerMixin):
             start_date: Optional[date] = None,
             end_date: Optional[date] = None,
             statement_ids: Optional[List[int]] = None,
-            analysis_types: Optional[List[str]] = None
-    ) -> List[Analysis]:
-        """Get filtered analysis data"""
+            analysis_types: Optional[List[str]] = None,
+            columns: Optional[tuple] = None
+    ) -> Query:
+        """Get query for filtered analysis data, as rows of the given columns if any"""
 
-        query = db.query(Analysis).filter(Analysis.user_id == user_id)
+        if columns:
+            query = db.query(*columns, Statement.original_filename).outerjoin(Analysis.statement)
+        else:
+            query = db.query(Analysis)
+        query = query.filter(Analysis.user_id == user_id)
 
         # Date filters
         if start_date:
@@ -121,9 +374,14 @@ class ExportService(LoggerMixin):
         if analysis_types:
             query = query.filter(Analysis.analysis_type.in_(analysis_types))
 
-        return query.order_by(Analysis.created_at.desc()).all()
+        return query.order_by(Analysis.created_at.desc())
 
-    def _export_to_pdf(self, analyses: List[Analysis], include_charts: bool = True) -> bytes:
+    def _export_to_pdf(
+            self,
+            analyses: List[Analysis],
+            stats: Dict[str, Any],
+            include_charts: bool = True
+    ) -> bytes:
         """Export analysis data to PDF format"""
 
         buffer = io.BytesIO()
@@ -145,11 +403,11 @@ class ExportService(LoggerMixin):
         # Summary section
         story.append(Paragraph("Executive Summary", styles['Heading2']))
 
-        # Calculate summary statistics
-        total_analyses = len(analyses)
-        avg_health_score = sum(a.financial_health_score or 0 for a in analyses) / total_analyses if total_analyses > 0 else 0
-        total_income = sum(a.total_income or 0 for a in analyses)
-        total_expenses = sum(a.total_expenses or 0 for a in analyses)
+        # Summary statistics are aggregated in SQL by _get_summary_stats
+        total_analyses = stats['total_analyses']
+        avg_health_score = stats['avg_health_score']
+        total_income = stats['total_income']
+        total_expenses = stats['total_expenses']
         net_cash_flow = total_income - total_expenses
 
         summary_data = [
@@ -227,49 +485,68 @@ class ExportService(LoggerMixin):
         buffer.seek(0)
         return buffer.getvalue()
 
-    def _export_to_csv(self, analyses: List[Analysis]) -> bytes:
-        """Export analysis data to CSV format"""
-
-        buffer = io.StringIO()
-        writer = csv.writer(buffer)
-
-        # Write header
-        headers = [
-            'Analysis ID', 'Statement Filename', 'Analysis Type', 'Date Created',
-            'Processing Time (seconds)', 'Financial Health Score', 'Total Income',
-            'Total Expenses', 'Net Cash Flow', 'Opening Balance', 'Closing Balance',
-            'Summary Text'
-        ]
-        writer.writerow(headers)
-
-        # Write data rows
-        for analysis in analyses:
-            row = [
-                analysis.id,
-                analysis.statement.original_filename if analysis.statement else 'N/A',
-                analysis.analysis_type or 'N/A',
-                analysis.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                analysis.processing_time_seconds or 0,
-                analysis.financial_health_score or 0,
-                analysis.total_income or 0,
-                analysis.total_expenses or 0,
-                analysis.net_cash_flow or 0,
-                analysis.opening_balance or 0,
-                analysis.closing_balance or 0,
-                (analysis.summary_text or '').replace('\n', ' ').replace('\r', ' ')
-            ]
-            writer.writerow(row)
-
-        # Convert to bytes
-        csv_content = buffer.getvalue()
-        return csv_content.encode('utf-8')
-
-    def _export_to_excel(self, analyses: List[Analysis], include_charts: bool = True) -> bytes:
+    @staticmethod
+    def _csv_frame(batch: List[Row]) -> pd.DataFrame:
+        """Format a batch of analysis rows for CSV with vectorised column operations"""
+        df = pd.DataFrame.from_records(batch, columns=list(batch[0]._fields))
+
+        df['original_filename'] = df['original_filename'].fillna('N/A')
+        df['analysis_type'] = df['analysis_type'].fillna('N/A')
+        df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
+        df[_CSV_NUMERIC_COLUMNS] = df[_CSV_NUMERIC_COLUMNS].fillna(0)
+        df['summary_text'] = df['summary_text'].fillna('') \
+            .str.replace('\n', ' ', regex=False) \
+            .str.replace('\r', ' ', regex=False)
+
+        return df[list(_CSV_HEADERS)]
+
+    def _export_to_csv(self, analyses: Iterable[Row]) -> Iterator[bytes]:
+        """Export analysis data to CSV format as encoded chunks"""
+
+        rows = iter(analyses)
+        batch = list(islice(rows, CSV_CHUNK_ROWS))
+        if not batch:
+            raise ValidationError("No analysis data found for the specified criteria")
+
+        # One chunk per batch keeps memory bounded by the chunk size
+        header = list(_CSV_HEADERS.values())
+        while batch:
+            yield self._csv_frame(batch).to_csv(index=False, header=header).encode('utf-8')
+            header = False
+            batch = list(islice(rows, CSV_CHUNK_ROWS))
+
+    @staticmethod
+    def _jsonb_array_sheet(query: Query, jsonb_column, fields: Dict[str, tuple]) -> pd.DataFrame:
+        """Expand a JSONB array column into one sheet row per object element"""
+
+        # Anything other than an array expands to no rows instead of raising
+        elements = func.jsonb_array_elements(
+            case((func.jsonb_typeof(jsonb_column) == 'array', jsonb_column), else_=literal_column("'[]'::jsonb"))
+        ).table_valued(column('value', JSONB), with_ordinality='position').lateral()
+
+        headers = ['Analysis ID', 'Statement', *fields]
+        rows = query.order_by(None).outerjoin(Analysis.statement).join(elements, true()).filter(
+            func.jsonb_typeof(elements.c.value) == 'object'
+        ).with_entities(
+            Analysis.id,
+            func.coalesce(Statement.original_filename, 'N/A'),
+            *[func.coalesce(elements.c.value[key].astext, default) for key, default in fields.values()]
+        ).order_by(Analysis.created_at.desc(), elements.c.position).all()
+
+        return pd.DataFrame(rows, columns=headers)
+
+    def _export_to_excel(self, analyses: List[Analysis], query: Query, include_charts: bool = True) -> bytes:
         """Export analysis data to Excel format with multiple sheets"""
 
         buffer = io.BytesIO()
 
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        # pandas writes body cells column by column, which xlsxwriter's constant_memory
+        # mode cannot handle, so only the string-sniffing options are turned off
+        with pd.ExcelWriter(
+            buffer,
+            engine='xlsxwriter',
+            engine_kwargs={'options': {'strings_to_formulas': False, 'strings_to_urls': False}}
+        ) as writer:
             # Summary sheet
             summary_data = []
             for analysis in analyses:
@@ -290,51 +567,18 @@ class ExportService(LoggerMixin):
             summary_df = pd.DataFrame(summary_data)
             summary_df.to_excel(writer, sheet_name='Summary', index=False)
 
-            # Detailed insights sheet
-            insights_data = []
-            for analysis in analyses:
-                if analysis.insights:
-                    try:
-                        insights = json.loads(analysis.insights)
-                        for insight in insights:
-                            insights_data.append({
-                                'Analysis ID': analysis.id,
-                                'Statement': analysis.statement.original_filename if analysis.statement else 'N/A',
-                                'Insight Type': insight.get('type', 'N/A'),
-                                'Title': insight.get('title', 'N/A'),
-                                'Description': insight.get('description', 'N/A'),
-                                'Impact': insight.get('impact', 'N/A'),
-                                'Priority': insight.get('priority', 'N/A')
-                            })
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-
-            if insights_data:
-                insights_df = pd.DataFrame(insights_data)
+            # Detail sheets are expanded from the JSONB arrays by Postgres
+            insights_df = self._jsonb_array_sheet(query, Analysis.insights, _INSIGHT_FIELDS)
+            if not insights_df.empty:
                 insights_df.to_excel(writer, sheet_name='Insights', index=False)
 
-            # Recommendations sheet
-            recommendations_data = []
-            for analysis in analyses:
-                if analysis.recommendations:
-                    try:
-                        recommendations = json.loads(analysis.recommendations)
-                        for rec in recommendations:
-                            recommendations_data.append({
-                                'Analysis ID': analysis.id,
-                                'Statement': analysis.statement.original_filename if analysis.statement else 'N/A',
-                                'Category': rec.get('category', 'N/A'),
-                                'Title': rec.get('title', 'N/A'),
-                                'Description': rec.get('description', 'N/A'),
-                                'Potential Savings': rec.get('potential_savings', 0),
-                                'Difficulty': rec.get('difficulty', 'N/A'),
-                                'Timeframe': rec.get('timeframe', 'N/A')
-                            })
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-
-            if recommendations_data:
-                recommendations_df = pd.DataFrame(recommendations_data)
+            recommendations_df = self._jsonb_array_sheet(
+                query, Analysis.recommendations, _RECOMMENDATION_FIELDS
+            )
+            if not recommendations_df.empty:
+                recommendations_df['Potential Savings'] = pd.to_numeric(
+                    recommendations_df['Potential Savings'], errors='coerce'
+                ).fillna(0)
                 recommendations_df.to_excel(writer, sheet_name='Recommendations', index=False)
 
         buffer.seek(0)
@@ -377,12 +621,12 @@ class ExportService(LoggerMixin):
                     'financial_health_score': analysis.financial_health_score
                 },
                 'analysis_results': {
-                    'transaction_categories': self._parse_json_field(analysis.transaction_categories),
-                    'spending_patterns': self._parse_json_field(analysis.spending_patterns),
-                    'anomalies': self._parse_json_field(analysis.anomalies),
-                    'insights': self._parse_json_field(analysis.insights),
-                    'recommendations': self._parse_json_field(analysis.recommendations),
-                    'risk_assessment': self._parse_json_field(analysis.risk_assessment)
+                    'transaction_categories': analysis.transaction_categories,
+                    'spending_patterns': analysis.spending_patterns,
+                    'anomalies': analysis.anomalies,
+                    'insights': analysis.insights,
+                    'recommendations': analysis.recommendations,
+                    'risk_assessment': analysis.risk_assessment
                 },
                 'text_analysis': {
                     'summary_text': analysis.summary_text,
@@ -391,105 +635,50 @@ class ExportService(LoggerMixin):
             }
             export_data['analyses'].append(analysis_data)
 
-        json_content = json.dumps(export_data, indent=2, default=str)
-        return json_content.encode('utf-8')
+        return orjson.dumps(export_data, option=orjson.OPT_INDENT_2, default=str)
 
-    def _export_charts_to_image(self, analyses: List[Analysis]) -> bytes:
+    def _export_charts_to_image(self, analyses: List[Row]) -> bytes:
         """Export charts as PNG image"""
+        return self._render_chart(
+            _render_dashboard_png,
+            [a.created_at for a in analyses],
+            [a.financial_health_score or 0 for a in analyses],
+            [a.total_income or 0 for a in analyses],
+            [a.total_expenses or 0 for a in analyses],
+            [a.analysis_type or 'Unknown' for a in analyses]
+        )
 
-        # Create a figure with multiple subplots
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-        fig.suptitle('Financial Analysis Dashboard', fontsize=20, fontweight='bold')
-
-        # Prepare data
-        dates = [a.created_at for a in analyses]
-        health_scores = [a.financial_health_score or 0 for a in analyses]
-        incomes = [a.total_income or 0 for a in analyses]
-        expenses = [a.total_expenses or 0 for a in analyses]
-
-        # Chart 1: Financial Health Score Trend
-        ax1.plot(dates, health_scores, marker='o', linewidth=2, markersize=6)
-        ax1.set_title('Financial Health Score Trend', fontsize=14, fontweight='bold')
-        ax1.set_ylabel('Health Score')
-        ax1.grid(True, alpha=0.3)
-        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        ax1.tick_params(axis='x', rotation=45)
-
-        # Chart 2: Income vs Expenses
-        width = 0.35
-        x = range(len(analyses))
-        ax2.bar([i - width/2 for i in x], incomes, width, label='Income', alpha=0.8)
-        ax2.bar([i + width/2 for i in x], expenses, width, label='Expenses', alpha=0.8)
-        ax2.set_title('Income vs Expenses Comparison', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('Amount ($)')
-        ax2.set_xlabel('Analysis')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-
-        # Chart 3: Net Cash Flow
-        net_flows = [inc - exp for inc, exp in zip(incomes, expenses)]
-        colors_flow = ['green' if nf >= 0 else 'red' for nf in net_flows]
-        ax3.bar(x, net_flows, color=colors_flow, alpha=0.7)
-        ax3.set_title('Net Cash Flow by Analysis', fontsize=14, fontweight='bold')
-        ax3.set_ylabel('Net Cash Flow ($)')
-        ax3.set_xlabel('Analysis')
-        ax3.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-        ax3.grid(True, alpha=0.3)
-
-        # Chart 4: Analysis Type Distribution
-        analysis_types = [a.analysis_type or 'Unknown' for a in analyses]
-        type_counts = pd.Series(analysis_types).value_counts()
-        ax4.pie(type_counts.values, labels=type_counts.index, autopct='%1.1f%%', startangle=90)
-        ax4.set_title('Analysis Type Distribution', fontsize=14, fontweight='bold')
-
-        plt.tight_layout()
+    def _render_chart(self, render, *args) -> bytes:
+        """Render a chart in the worker pool, or inline where child processes are not allowed"""
+        # Celery prefork workers are daemonic and cannot start their own children
+        if multiprocessing.current_process().daemon:
+            return render(*args)
 
-        # Save to buffer
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        plt.close()
-
-        return buffer.getvalue()
+        # pyplot is not thread-safe, and the sync export endpoint runs in a threadpool,
+        # so rendering also moves off the request thread into separate processes
+        executor = _get_chart_executor()
+        try:
+            return executor.submit(render, *args).result()
+        except BrokenProcessPool:
+            # A crashed renderer breaks the whole pool; replace it and try once more
+            _reset_chart_executor(executor)
+            return _get_chart_executor().submit(render, *args).result()
 
     def _generate_summary_chart(self, analyses: List[Analysis]) -> Optional[Image]:
         """Generate a summary chart for PDF inclusion"""
 
         try:
-            # Create a simple chart
-            fig, ax = plt.subplots(figsize=(8, 4))
-
-            dates = [a.created_at for a in analyses]
-            health_scores = [a.financial_health_score or 0 for a in analyses]
-
-            ax.plot(dates, health_scores, marker='o', linewidth=2)
-            ax.set_title('Financial Health Score Trend')
-            ax.set_ylabel('Health Score')
-            ax.grid(True, alpha=0.3)
-
-
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-            buffer.seek(0)
-            plt.close()
-
-
-            img = Image(buffer, width=6*inch, height=3*inch)
+            png = self._render_chart(
+                _render_summary_chart_png,
+                [a.created_at for a in analyses],
+                [a.financial_health_score or 0 for a in analyses]
+            )
 
-            return img
+            return Image(io.BytesIO(png), width=6*inch, height=3*inch)
 
         except Exception as e:
             self.log_error(e, "_generate_summary_chart")
             return None
 
-    def _parse_json_field(self, json_field: str) -> Any:
-        """Parse JSON field safely"""
-        if not json_field:
-            return None
-        try:
-            return json.loads(json_field)
-        except (json.JSONDecodeError, TypeError):
-            return None
-
 
 export_service = ExportService()
\ No newline at end of file
@@ -1,15 +1,29 @@
 """File service for handling file uploads and storage"""
 
-import os
+import asyncio
 import hashlib
-from typing import Optional, Tuple
+import os
+import time
+import uuid
+from typing import List, Optional, Tuple
 from fastapi import UploadFile
+import httpx
 import cloudinary
 import cloudinary.uploader
+import cloudinary.utils
+import fitz  # PyMuPDF for PDF processing
 from app.core.config import settings
 from app.core.logging import LoggerMixin
 from app.core.exceptions import FileProcessingError, ValidationError
 
+# A born-digital statement page carries far more text than this; less means a scan
+MIN_TEXT_CHARS_PER_PAGE = 50
+MAX_GARBAGE_CHAR_RATIO = 0.05
+# Above this size uploads go up in chunks, so a network stall retries one chunk, not the file
+LARGE_UPLOAD_THRESHOLD = 20 * 1024 * 1024
+LARGE_UPLOAD_CHUNK_SIZE = 6_000_000
+HASH_CHUNK_SIZE = 1024 * 1024
+
 
 class FileService(LoggerMixin):
     """Service for file upload and management"""
@@ -21,6 +35,13 @@ class FileService(LoggerMixin):
             api_key=settings.CLOUDINARY_API_KEY,
             api_secret=settings.CLOUDINARY_API_SECRET
         )
+        # Shared keep-alive pool; sync client behind to_thread because Celery tasks
+        # each run a fresh event loop and an AsyncClient is bound to the loop it first used
+        self._http = httpx.Client(timeout=30, limits=httpx.Limits(max_keepalive_connections=10))
+        # Parsed once; a membership test on the raw comma-separated string matched substrings
+        self._allowed_file_types = frozenset(
+            file_type.strip() for file_type in settings.ALLOWED_FILE_TYPES.split(",") if file_type.strip()
+        )
     
     def validate_file(self, file: UploadFile) -> None:
         """Validate uploaded file"""
@@ -32,13 +53,13 @@ class FileService(LoggerMixin):
                 )
             
             # Check file type
-            if file.content_type not in settings.ALLOWED_FILE_TYPES:
+            if file.content_type not in self._allowed_file_types:
                 raise ValidationError(
                     f"File type {file.content_type} not allowed. Allowed types: {settings.ALLOWED_FILE_TYPES}"
                 )
             
             # Check file extension
-            if not file.filename.lower().endswith('.pdf'):
+            if file.filename[-4:].lower() != '.pdf':
                 raise ValidationError("Only PDF files are allowed")
             
             self.log_operation(
@@ -54,18 +75,27 @@ class FileService(LoggerMixin):
             self.log_error(e, "validate_file", filename=file.filename)
             raise FileProcessingError("File validation failed")
     
+    async def compute_sha256(self, file: UploadFile) -> str:
+        """Hash the uploaded file's content, leaving it rewound for the upload"""
+
+        def digest() -> str:
+            file.file.seek(0)
+            sha256 = hashlib.sha256()
+            for chunk in iter(lambda: file.file.read(HASH_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+            file.file.seek(0)
+            return sha256.hexdigest()
+
+        return await asyncio.to_thread(digest)
+
     def generate_unique_filename(self, original_filename: str, user_id: int) -> str:
         """Generate unique filename for storage"""
         try:
-            # Create hash from user_id and original filename
-            hash_input = f"{user_id}_{original_filename}_{os.urandom(8).hex()}"
-            file_hash = hashlib.md5(hash_input.encode()).hexdigest()
-            
             # Get file extension
             _, ext = os.path.splitext(original_filename)
             
-            # Create unique filename
-            unique_filename = f"statements/{user_id}/{file_hash}{ext}"
+            # Create unique filename; a random UUID is unique without hashing anything
+            unique_filename = f"statements/{user_id}/{uuid.uuid4().hex}{ext}"
             
             self.log_operation(
                 "generate_unique_filename",
@@ -80,28 +110,53 @@ class FileService(LoggerMixin):
             self.log_error(e, "generate_unique_filename", filename=original_filename)
             raise FileProcessingError("Failed to generate unique filename")
     
+    async def start_cloudinary_upload(
+        self, 
+        file: UploadFile, 
+        user_id: int,
+        unique_filename: str
+    ) -> "asyncio.Future[Tuple[str, str]]":
+        """Hand the upload to a worker thread and return a future for its public_id and URL"""
+        await file.seek(0)
+        # run_in_executor submits right away, so the upload is running once this returns
+        return asyncio.get_running_loop().run_in_executor(
+            None, self._upload_to_cloudinary_sync, file, user_id, unique_filename
+        )
+    
     async def upload_to_cloudinary(
         self, 
         file: UploadFile, 
-        user_id: int
+        user_id: int,
+        unique_filename: str
+    ) -> Tuple[str, str]:
+        """Upload file to Cloudinary under unique_filename and return public_id and URL"""
+        upload = await self.start_cloudinary_upload(file, user_id, unique_filename)
+        return await upload
+    
+    def _upload_to_cloudinary_sync(
+        self, 
+        file: UploadFile, 
+        user_id: int,
+        unique_filename: str
     ) -> Tuple[str, str]:
-        """Upload file to Cloudinary and return public_id and URL"""
+        """Upload the spooled file to Cloudinary from a worker thread"""
         try:
-            # Generate unique filename
-            unique_filename = self.generate_unique_filename(file.filename, user_id)
-            
-            # Read file content
-            file_content = await file.read()
-            
-            # Upload to Cloudinary
-            upload_result = cloudinary.uploader.upload(
-                file_content,
+            # Upload straight from the spooled upload file instead of reading it all into memory
+            upload_options = dict(
                 public_id=unique_filename,
                 resource_type="raw",  # For non-image files
                 folder=f"intellibank/statements/{user_id}",
                 use_filename=True,
                 unique_filename=False
             )
+            if (file.size or 0) > LARGE_UPLOAD_THRESHOLD:
+                upload_result = cloudinary.uploader.upload_large(
+                    file.file,
+                    chunk_size=LARGE_UPLOAD_CHUNK_SIZE,
+                    **upload_options
+                )
+            else:
+                upload_result = cloudinary.uploader.upload(file.file, **upload_options)
             
             public_id = upload_result["public_id"]
             secure_url = upload_result["secure_url"]
@@ -119,6 +174,41 @@ class FileService(LoggerMixin):
             self.log_error(e, "upload_to_cloudinary", filename=file.filename)
             raise FileProcessingError("Failed to upload file to cloud storage")
     
+    def upload_export(self, content: bytes, filename: str, user_id: int) -> str:
+        """Upload a generated export privately and return a time-limited download URL"""
+        try:
+            upload_result = cloudinary.uploader.upload(
+                content,
+                public_id=filename,
+                resource_type="raw",
+                type="authenticated",
+                folder=f"intellibank/exports/{user_id}",
+                use_filename=True,
+                unique_filename=False
+            )
+            
+            download_url = cloudinary.utils.private_download_url(
+                upload_result["public_id"],
+                "",
+                resource_type="raw",
+                type="authenticated",
+                attachment=True,
+                expires_at=int(time.time()) + settings.EXPORT_DOWNLOAD_URL_TTL_SECONDS
+            )
+            
+            self.log_operation(
+                "upload_export",
+                filename=filename,
+                public_id=upload_result["public_id"],
+                user_id=user_id
+            )
+            
+            return download_url
+            
+        except Exception as e:
+            self.log_error(e, "upload_export", filename=filename, user_id=user_id)
+            raise FileProcessingError("Failed to upload export to cloud storage")
+    
     def delete_from_cloudinary(self, public_id: str) -> bool:
         """Delete file from Cloudinary"""
         try:
@@ -141,34 +231,57 @@ class FileService(LoggerMixin):
             self.log_error(e, "delete_from_cloudinary", public_id=public_id)
             return False
     
-    async def download_from_cloudinary(self, public_id: str) -> bytes:
-        """Download file content from Cloudinary"""
+    async def download_from_cloudinary(self, public_id: str, url: Optional[str] = None) -> bytes:
+        """Download file content from Cloudinary, using the stored URL when there is one"""
         try:
-            import httpx
-            
-            # Get the file URL
-            url = cloudinary.utils.cloudinary_url(
-                public_id,
-                resource_type="raw"
-            )[0]
+            # Only rows without a stored URL pay for building one through the SDK
+            if not url:
+                url = cloudinary.utils.cloudinary_url(
+                    public_id,
+                    resource_type="raw"
+                )[0]
             
             # Download file content
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                
-                self.log_operation(
-                    "download_from_cloudinary",
-                    public_id=public_id,
-                    size=len(response.content)
-                )
-                
-                return response.content
-                
+            response = await asyncio.to_thread(self._http.get, url)
+            response.raise_for_status()
+            
+            self.log_operation(
+                "download_from_cloudinary",
+                public_id=public_id,
+                size=len(response.content)
+            )
+            
+            return response.content
+            
         except Exception as e:
             self.log_error(e, "download_from_cloudinary", public_id=public_id)
             raise FileProcessingError("Failed to download file from cloud storage")
 
+    def extract_text_fast(self, pdf_bytes: bytes) -> Optional[str]:
+        """Extract the embedded text layer of a PDF, or None if it looks scanned"""
+        try:
+            # Serial on purpose: a page takes milliseconds, and forking a pool out of a
+            # threads-pool Celery worker costs far more than it saves
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+                page_count = doc.page_count
+                pages = [page.get_text("text") for page in doc]
+            text = "\f".join(pages)
+        except Exception as e:
+            self.log_error(e, "extract_text_fast")
+            return None
+
+        content = "".join(text.split())
+        if len(content) < MIN_TEXT_CHARS_PER_PAGE * max(page_count, 1):
+            return None
+
+        # Broken font encodings come out as control or replacement characters
+        garbage = sum(1 for ch in content if ch == "\ufffd" or not ch.isprintable())
+        if garbage / len(content) > MAX_GARBAGE_CHAR_RATIO:
+            return None
+
+        self.log_operation("extract_text_fast", pages=page_count, chars=len(text))
+        return text
+
 
 # Create service instance
 file_service = FileService()
\ No newline at end of file
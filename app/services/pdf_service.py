@@ -1,15 +1,43 @@
 """Enhanced PDF to Excel conversion service using Adobe API"""
 
-import time
-import tempfile
+import asyncio
+import io
 import os
-from typing import Optional, Dict, Any
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Optional, Union
 from fastapi import HTTPException
-import requests
+import fitz  # PyMuPDF for local table extraction
+import httpx
 import pandas as pd
 from app.core.config import settings
 from app.core.logging import LoggerMixin
 from app.core.exceptions import ExternalServiceError, FileProcessingError
+from app.services.cache_service import cache_service
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+
+def adobe_job_signal_key(job_id: str) -> str:
+    """Redis key the Adobe webhook signals when an export job finishes"""
+    return f"adobe_job:{job_id}"
+
+
+def _parse_xlsx_bytes(excel_content: bytes) -> pd.DataFrame:
+    """Read a converted workbook from memory into a single DataFrame"""
+    sheets = pd.read_excel(io.BytesIO(excel_content), sheet_name=None, engine="calamine")
+
+    # Take the first sheet or combine all sheets
+    if len(sheets) == 1:
+        return list(sheets.values())[0]
+
+    # Combine all sheets in one concat rather than re-copying per sheet
+    frames = []
+    for sheet_name, sheet_df in sheets.items():
+        sheet_df['sheet_name'] = sheet_name
+        frames.append(sheet_df)
+    return pd.concat(frames, ignore_index=True)
 
 
 class PDFExcelService(LoggerMixin):
@@ -27,35 +55,61 @@ class PDFExcelService(LoggerMixin):
         if not self.client_id or not self.client_secret:
             raise ValueError("Adobe API credentials must be configured")
 
-    def generate_token(self) -> str:
-        """Generate access token for Adobe PDF Services API"""
-        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        payload = {
-            'client_id': self.client_id,
-            'client_secret': self.client_secret
-        }
+        # One keep-alive pool for every Adobe call instead of a new TLS handshake per request;
+        # calls go through to_thread so blocking I/O stays off the event loop
+        self._http = httpx.Client(timeout=30, limits=httpx.Limits(max_keepalive_connections=10))
+
+        # Access tokens live for hours, so one is shared across conversions until near expiry.
+        # A thread lock rather than asyncio.Lock: Celery tasks each run on a fresh event loop
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+
+    async def generate_token(self) -> str:
+        """Get an access token for Adobe PDF Services API, reusing a cached one while valid"""
+        return await asyncio.to_thread(self._get_token)
+
+    def _get_token(self) -> str:
+        """Return the cached access token, requesting a new one when it is about to expire"""
+        with self._token_lock:
+            if self._token and time.monotonic() < self._token_expires_at - TOKEN_REFRESH_MARGIN_SECONDS:
+                return self._token
+
+            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+            payload = {
+                'client_id': self.client_id,
+                'client_secret': self.client_secret
+            }
 
-        try:
-            self.log_operation("generate_token_request")
-            
-            response = requests.post(self.TOKEN_ENDPOINT, data=payload, headers=headers)
-            response.raise_for_status()
+            try:
+                self.log_operation("generate_token_request")
+
+                requested_at = time.monotonic()
+                response = self._http.post(self.TOKEN_ENDPOINT, data=payload, headers=headers)
+                response.raise_for_status()
 
-            token_data = response.json()
-            access_token = token_data.get('access_token')
+                token_data = response.json()
+                access_token = token_data.get('access_token')
 
-            if not access_token:
-                raise ExternalServiceError("No access token in Adobe API response")
+                if not access_token:
+                    raise ExternalServiceError("No access token in Adobe API response")
 
-            self.log_operation("generate_token_success")
-            return access_token
+                self._token = access_token
+                self._token_expires_at = requested_at + float(token_data.get('expires_in', 0))
 
-        except requests.RequestException as e:
-            self.log_error(e, "generate_token")
-            raise ExternalServiceError(f"Failed to generate Adobe API token: {str(e)}")
+                self.log_operation("generate_token_success", expires_in=token_data.get('expires_in'))
+                return access_token
 
-    def create_asset_from_bytes(self, file_content: bytes, access_token: str) -> Dict[str, Any]:
-        """Create an asset and upload PDF content from bytes"""
+            except httpx.HTTPError as e:
+                self.log_error(e, "generate_token")
+                raise ExternalServiceError(f"Failed to generate Adobe API token: {str(e)}")
+
+    async def create_asset_from_bytes(
+        self,
+        file_content: Union[bytes, BinaryIO],
+        access_token: str
+    ) -> Dict[str, Any]:
+        """Create an asset and upload PDF content from bytes or a binary file"""
         headers = {
             "X-API-Key": self.client_id,
             "Authorization": f'Bearer {access_token}',
@@ -63,11 +117,22 @@ class PDFExcelService(LoggerMixin):
         }
         payload = {"mediaType": "application/pdf"}
 
+        if isinstance(file_content, bytes):
+            body, content_size = file_content, len(file_content)
+        else:
+            file_content.seek(0, os.SEEK_END)
+            content_size = file_content.tell()
+            file_content.seek(0)
+            # Stream the file in chunks so a disk-spooled upload is never fully loaded
+            body = iter(lambda: file_content.read(UPLOAD_CHUNK_SIZE), b"")
+
         try:
-            self.log_operation("create_asset_request", content_size=len(file_content))
+            self.log_operation("create_asset_request", content_size=content_size)
             
             # Create asset
-            response = requests.post(self.ASSETS_ENDPOINT, headers=headers, json=payload)
+            response = await asyncio.to_thread(
+                self._http.post, self.ASSETS_ENDPOINT, headers=headers, json=payload
+            )
             response.raise_for_status()
             asset_info = response.json()
 
@@ -77,21 +142,23 @@ class PDFExcelService(LoggerMixin):
             self.log_operation("asset_created", asset_id=asset_id)
 
             # Upload file content
-            put_response = requests.put(
+            put_response = await asyncio.to_thread(
+                self._http.put,
                 upload_uri,
-                headers={"Content-Type": "application/pdf"},
-                data=file_content
+                # Presigned storage URLs reject chunked transfer encoding, so send the length
+                headers={"Content-Type": "application/pdf", "Content-Length": str(content_size)},
+                content=body
             )
             put_response.raise_for_status()
 
             self.log_operation("file_uploaded", asset_id=asset_id)
             return asset_info
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             self.log_error(e, "create_asset")
             raise ExternalServiceError(f"Failed to create Adobe asset: {str(e)}")
 
-    def export_to_excel(self, asset_info: Dict[str, Any], access_token: str) -> bytes:
+    async def export_to_excel(self, asset_info: Dict[str, Any], access_token: str) -> bytes:
         """Export PDF asset to Excel format and return content"""
         headers = {
             "X-API-Key": self.client_id,
@@ -104,12 +171,23 @@ class PDFExcelService(LoggerMixin):
             "targetFormat": "xlsx",
             "ocrLang": "en-US"
         }
+        if settings.ADOBE_WEBHOOK_URL:
+            # Adobe calls back when the job finishes, so waiting needs no status polling
+            payload["notifiers"] = [{
+                "type": "CALLBACK",
+                "data": {
+                    "url": settings.ADOBE_WEBHOOK_URL,
+                    "headers": {"x-webhook-secret": settings.ADOBE_WEBHOOK_SECRET or ""}
+                }
+            }]
 
         try:
             self.log_operation("export_request", asset_id=asset_info["assetID"])
             
             # Submit export job
-            response = requests.post(self.EXPORT_ENDPOINT, headers=headers, json=payload)
+            response = await asyncio.to_thread(
+                self._http.post, self.EXPORT_ENDPOINT, headers=headers, json=payload
+            )
             response.raise_for_status()
 
             poll_url = response.headers.get("Location")
@@ -119,18 +197,26 @@ class PDFExcelService(LoggerMixin):
             job_id = poll_url.rstrip("/").split("/")[-2]
             self.log_operation("export_job_submitted", job_id=job_id)
 
-            # Poll for completion and download
-            download_url = self._poll_job_status(poll_url, headers)
-            excel_content = self._download_excel_content(download_url)
+            if settings.ADOBE_WEBHOOK_URL:
+                # The callback may reach any process, so it signals through Redis; without
+                # one in time this falls through to ordinary polling
+                signalled = await cache_service.wait(
+                    adobe_job_signal_key(job_id), settings.ADOBE_WEBHOOK_TIMEOUT_SECONDS
+                )
+                self.log_operation("export_job_callback", job_id=job_id, signalled=signalled)
+
+            # Poll for completion and download; after a callback the first check finds it done
+            download_url = await self._poll_job_status(poll_url, headers)
+            excel_content = await self._download_excel_content(download_url)
             
             self.log_operation("export_completed", job_id=job_id, content_size=len(excel_content))
             return excel_content
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             self.log_error(e, "export_to_excel")
             raise ExternalServiceError(f"Adobe export failed: {str(e)}")
 
-    def _poll_job_status(
+    async def _poll_job_status(
         self, 
         poll_url: str, 
         headers: Dict[str, str], 
@@ -145,7 +231,7 @@ class PDFExcelService(LoggerMixin):
             try:
                 self.log_operation("polling_status", attempt=attempts + 1)
                 
-                status_response = requests.get(poll_url, headers=headers)
+                status_response = await asyncio.to_thread(self._http.get, poll_url, headers=headers)
                 status_response.raise_for_status()
 
                 status_data = status_response.json()
@@ -165,82 +251,120 @@ class PDFExcelService(LoggerMixin):
                     raise ExternalServiceError(f"Adobe export job failed: {error_msg}")
 
                 attempts += 1
-                time.sleep(current_interval)
+                # Yields the event loop so other conversions progress while this one waits
+                await asyncio.sleep(current_interval)
                 
                 # Exponential backoff with jitter
                 current_interval = min(current_interval * 1.5, 60)
 
-            except requests.RequestException as e:
+            except httpx.HTTPError as e:
                 self.log_error(e, "poll_job_status", attempt=attempts + 1)
                 raise ExternalServiceError(f"Status polling failed: {str(e)}")
 
         raise ExternalServiceError("Adobe export job timed out")
 
-    def _download_excel_content(self, download_url: str) -> bytes:
+    async def _download_excel_content(self, download_url: str) -> bytes:
         """Download Excel content from Adobe"""
         try:
             self.log_operation("download_excel_request")
             
-            response = requests.get(download_url, stream=True)
-            response.raise_for_status()
-            
-            content = response.content
+            content = await asyncio.to_thread(self._stream_download, download_url)
             self.log_operation("download_excel_success", size=len(content))
             
             return content
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             self.log_error(e, "download_excel_content")
             raise ExternalServiceError(f"Failed to download Excel content: {str(e)}")
 
+    def _stream_download(self, download_url: str) -> bytearray:
+        """Read a download in chunks into one buffer sized from Content-Length"""
+        with self._http.stream("GET", download_url) as response:
+            response.raise_for_status()
+
+            # Content-Length only matches the decoded body when no encoding is applied
+            size = response.headers.get("content-length")
+            if size is None or response.headers.get("content-encoding"):
+                buffer = bytearray()
+                for chunk in response.iter_bytes(UPLOAD_CHUNK_SIZE):
+                    buffer += chunk
+                return buffer
+
+            # The HTTP layer rejects bodies that disagree with Content-Length,
+            # so every chunk fits in the preallocated buffer
+            buffer = bytearray(int(size))
+            with memoryview(buffer) as view:
+                position = 0
+                for chunk in response.iter_bytes(UPLOAD_CHUNK_SIZE):
+                    view[position:position + len(chunk)] = chunk
+                    position += len(chunk)
+            return buffer
+
+    def _extract_tables_locally(self, pdf_content: bytes) -> Optional[pd.DataFrame]:
+        """Extract tables from a text-based PDF, or return None when Adobe OCR is needed"""
+        with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+            # Scanned statements have no text layer for the table finder to work with
+            if not any(page.get_text().strip() for page in doc):
+                return None
+
+            frames = []
+            for page in doc:
+                for table in page.find_tables().tables:
+                    table_df = table.to_pandas()
+                    if not table_df.empty:
+                        frames.append(table_df)
+
+        if not frames:
+            return None
+        if len(frames) == 1:
+            return frames[0]
+
+        # Label each table the way Adobe's multi-sheet workbooks are labelled
+        for index, table_df in enumerate(frames, start=1):
+            table_df['sheet_name'] = f"Table {index}"
+        return pd.concat(frames, ignore_index=True)
+
     async def convert_pdf_to_excel(self, pdf_content: bytes) -> pd.DataFrame:
         """Convert PDF content to Excel and return as pandas DataFrame"""
         try:
             self.log_operation("pdf_conversion_start", pdf_size=len(pdf_content))
+
+            # Text-based PDFs are parsed locally; only scanned ones need the Adobe round trips
+            try:
+                df = await asyncio.to_thread(self._extract_tables_locally, pdf_content)
+            except Exception as e:
+                self.log_error(e, "local_table_extraction")
+                df = None
+
+            if df is not None:
+                self.log_operation(
+                    "pdf_conversion_success",
+                    rows=len(df),
+                    columns=len(df.columns),
+                    source="local"
+                )
+                return df
             
             # Generate token
-            access_token = self.generate_token()
+            access_token = await self.generate_token()
             
             # Create asset and upload
-            asset_info = self.create_asset_from_bytes(pdf_content, access_token)
+            asset_info = await self.create_asset_from_bytes(pdf_content, access_token)
             
             # Export to Excel
-            excel_content = self.export_to_excel(asset_info, access_token)
+            excel_content = await self.export_to_excel(asset_info, access_token)
+            
+            # Parse off the event loop; a thread avoids forking a pool from threaded workers
+            df = await asyncio.to_thread(_parse_xlsx_bytes, excel_content)
+            
+            self.log_operation(
+                "pdf_conversion_success", 
+                rows=len(df), 
+                columns=len(df.columns)
+            )
+            
+            return df
             
-            # Convert to DataFrame
-            with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as temp_file:
-                temp_file.write(excel_content)
-                temp_file.flush()
-                
-                try:
-                    # Read Excel file into DataFrame
-                    df = pd.read_excel(temp_file.name, sheet_name=None)
-                    
-                    # If multiple sheets, combine them
-                    if isinstance(df, dict):
-                        # Take the first sheet or combine all sheets
-                        if len(df) == 1:
-                            df = list(df.values())[0]
-                        else:
-                            # Combine all sheets
-                            combined_df = pd.DataFrame()
-                            for sheet_name, sheet_df in df.items():
-                                sheet_df['sheet_name'] = sheet_name
-                                combined_df = pd.concat([combined_df, sheet_df], ignore_index=True)
-                            df = combined_df
-                    
-                    self.log_operation(
-                        "pdf_conversion_success", 
-                        rows=len(df), 
-                        columns=len(df.columns)
-                    )
-                    
-                    return df
-                    
-                finally:
-                    # Clean up temp file
-                    os.unlink(temp_file.name)
-                    
         except Exception as e:
             self.log_error(e, "convert_pdf_to_excel")
             raise FileProcessingError(f"PDF to Excel conversion failed: {str(e)}")
@@ -252,10 +376,18 @@ class PDFExcelService(LoggerMixin):
                 "total_rows": len(df),
                 "total_columns": len(df.columns),
                 "column_names": df.columns.tolist(),
-                "data_types": df.dtypes.to_dict(),
-                "null_counts": df.isnull().sum().to_dict(),
-                "sample_data": df.head(5).to_dict('records') if len(df) > 0 else []
+                # Dtype names rather than numpy dtype objects, which do not serialise
+                "data_types": df.dtypes.astype(str).to_dict(),
+                "null_counts": {},
+                "sample_data": []
             }
+
+            if len(df) > 0:
+                # Counted a column at a time instead of building a boolean copy of the frame
+                metadata["null_counts"] = {
+                    column: int(df[column].isna().sum()) for column in df.columns
+                }
+                metadata["sample_data"] = df.iloc[:5].to_dict('records')
             
             self.log_operation("metadata_extracted", rows=metadata["total_rows"])
             return metadata
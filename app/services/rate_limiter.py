@@ -0,0 +1,174 @@
+"""Client-side rate limiting for Gemini API calls"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Mapping, Optional
+
+from app.core.config import settings
+from app.core.logging import LoggerMixin
+from app.core.exceptions import ServiceUnavailableError
+
+_RPM_WINDOW_SECONDS = 60.0
+_POLL_INTERVAL_SECONDS = 0.05
+
+
+def _parse_retry_after(headers: Optional[Mapping[str, str]]) -> float:
+    """Read the retry-after delay in seconds from response headers"""
+    if not headers:
+        return 0.0
+    try:
+        return max(float(headers.get("retry-after", 0)), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class GeminiLimiter(LoggerMixin):
+    """Concurrency and RPM limiter tuned with AIMD, with a circuit breaker for outages"""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: int,
+        alpha: float = 1.0,
+        beta: float = 0.5,
+        fail_max: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.alpha = alpha
+        self.beta = beta
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._sent_at: deque = deque()
+        self._blocked_until = 0.0
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        # Task making the single trial call once the open window has expired
+        self._probe_task: Optional[asyncio.Task] = None
+        # Worker threads each run their own event loop but share this limiter
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        """Current number of concurrent calls allowed"""
+        return int(self._limit)
+
+    def check_circuit(self) -> None:
+        """Fail fast while the circuit is open after repeated rate limits or outages"""
+        with self._lock:
+            self._raise_if_open(time.monotonic())
+
+    def _raise_if_open(self, now: float) -> None:
+        """Reject calls while open or while a trial call is in flight; needs the lock"""
+        remaining = self._open_until - now
+        if remaining > 0 or self._probe_task is not None:
+            raise ServiceUnavailableError(
+                "Gemini is temporarily unavailable",
+                details={"retry_after": int(max(remaining, 0)) + 1}
+            )
+
+    def _enter_circuit(self) -> None:
+        """Admit a call through the breaker, making it the trial call once the window expires"""
+        with self._lock:
+            self._raise_if_open(time.monotonic())
+            if self._open_until:
+                # Half-open: this call decides whether the circuit closes or re-opens
+                self._probe_task = asyncio.current_task()
+                self.log_operation("gemini_circuit_half_open")
+
+    def _wait_time(self, now: float) -> float:
+        """Seconds to wait before another call may start, or 0 if one may start now; needs the lock"""
+        while self._sent_at and now - self._sent_at[0] >= _RPM_WINDOW_SECONDS:
+            self._sent_at.popleft()
+
+        wait = self._blocked_until - now
+        if wait > 0:
+            return wait
+        if self.requests_per_minute and len(self._sent_at) >= self.requests_per_minute:
+            return _RPM_WINDOW_SECONDS - (now - self._sent_at[0])
+        if self._in_flight >= self.limit:
+            return _POLL_INTERVAL_SECONDS
+        return 0.0
+
+    def _try_admit(self) -> float:
+        """Admit a call if one may start now and return 0, else return seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._wait_time(now)
+            if wait <= 0:
+                self._in_flight += 1
+                self._sent_at.append(now)
+            return wait
+
+    async def __aenter__(self) -> "GeminiLimiter":
+        self._enter_circuit()
+        # Polls instead of holding an asyncio primitive: worker threads each run their
+        # own event loop, and asyncio primitives are bound to a single loop
+        while True:
+            wait = self._try_admit()
+            if wait <= 0:
+                return self
+            await asyncio.sleep(max(wait, _POLL_INTERVAL_SECONDS))
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        with self._lock:
+            self._in_flight -= 1
+            if self._probe_task is not None and self._probe_task is asyncio.current_task():
+                # The trial call ended without a verdict; let the next call try instead
+                self._probe_task = None
+        return False
+
+    def record_response(self, status: int, headers: Optional[Mapping[str, str]] = None) -> None:
+        """Feed a Gemini response status back into the AIMD controller and circuit breaker"""
+        with self._lock:
+            self._record_status(status, headers)
+
+    def _record_status(self, status: int, headers: Optional[Mapping[str, str]]) -> None:
+        """Apply one response status to the controller and breaker; needs the lock"""
+        if status == 429 or status >= 500:
+            self._record_failure()
+        elif status < 400:
+            self._consecutive_failures = 0
+            if self._open_until:
+                self._open_until = 0.0
+                self._probe_task = None
+                self.log_operation("gemini_circuit_closed")
+
+        if status == 429:
+            self._limit = max(1.0, self._limit * self.beta)
+            retry_after = _parse_retry_after(headers)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            self.log_operation("gemini_rate_limited", limit=self.limit, retry_after=retry_after)
+        elif status < 400:
+            self._limit = min(float(self.max_concurrency), self._limit + self.alpha / self._limit)
+
+    def record_transport_error(self) -> None:
+        """Count a timed-out or dropped Gemini call toward the circuit breaker"""
+        with self._lock:
+            self._record_failure()
+
+    def _record_failure(self) -> None:
+        """Count one failed call, opening the circuit after fail_max in a row; needs the lock"""
+        self._consecutive_failures += 1
+        # A failure while half-open re-opens the circuit without waiting for fail_max
+        if self._probe_task is not None or self._consecutive_failures >= self.fail_max:
+            self._probe_task = None
+            self._open_until = time.monotonic() + self.reset_timeout
+            self.log_operation(
+                "gemini_circuit_open", failures=self._consecutive_failures, reset_timeout=self.reset_timeout
+            )
+
+
+# Create limiter instance
+gemini_limiter = GeminiLimiter(
+    max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+    requests_per_minute=settings.GEMINI_RPM,
+    fail_max=settings.GEMINI_CIRCUIT_FAIL_MAX,
+    reset_timeout=settings.GEMINI_CIRCUIT_RESET_SECONDS
+)
@@ -1,8 +1,10 @@
 """Statement service for managing bank statements"""
 
+import asyncio
+from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func, or_
 from fastapi import UploadFile
 from app.models.statement import Statement, StatementStatus, StatementCategory
 from app.schemas.statement import StatementCreate, StatementUpdate, StatementListParams
@@ -10,6 +12,9 @@ from app.services.base import BaseService
 from app.services.file_service import file_service
 from app.core.exceptions import ValidationError, FileProcessingError
 
+# An UPLOADING row older than this belongs to an upload that died before finishing
+STALE_UPLOAD_AGE = timedelta(minutes=15)
+
 
 class StatementService(BaseService[Statement, StatementCreate, StatementUpdate]):
     """Service for managing bank statements"""
@@ -28,23 +33,82 @@ class StatementService(BaseService[Statement, StatementCreate, StatementUpdate])
         try:
 
             file_service.validate_file(file)
-            
 
-            public_id, secure_url = await file_service.upload_to_cloudinary(file, user_id)
+            # Re-uploading a statement the user already has returns the existing row
+            # instead of paying for another upload and conversion
+            content_sha256 = await file_service.compute_sha256(file)
+            existing = db.query(Statement).filter(
+                Statement.user_id == user_id,
+                Statement.content_sha256 == content_sha256,
+                Statement.is_active.is_(True)
+            ).first()
+            if existing and existing.status == StatementStatus.UPLOADING:
+                if datetime.utcnow() - existing.created_at < STALE_UPLOAD_AGE:
+                    # Another request is still storing this file; its row has no file yet
+                    raise ValidationError("This statement is already being uploaded")
+                # Left behind by a crashed upload; retire it so this upload can take its place
+                existing.status = StatementStatus.FAILED
+                existing.error_message = "Upload did not complete"
+                existing.is_active = False
+                db.commit()
+                existing = None
+            elif existing and existing.status == StatementStatus.FAILED:
+                # A failed statement can't be analyzed; retire it so re-uploading starts over
+                existing.is_active = False
+                db.commit()
+                existing = None
+            if existing:
+                self.log_operation(
+                    "upload_statement_duplicate",
+                    statement_id=existing.id,
+                    user_id=user_id,
+                    filename=file.filename
+                )
+                return existing
             
 
-            statement = self.create(
-                db,
-                statement_data,
-                user_id=user_id,
-                filename=file_service.generate_unique_filename(file.filename, user_id),
-                original_filename=file.filename,
-                file_size=file.size,
-                file_type=file.content_type,
-                cloudinary_public_id=public_id,
-                cloudinary_url=secure_url,
-                status=StatementStatus.UPLOADED
-            )
+            # One name for both the stored object and the row, so they stay matched
+            unique_filename = file_service.generate_unique_filename(file.filename, user_id)
+
+            # The upload is already running in a worker thread when this returns, so
+            # the placeholder row insert below overlaps it
+            upload = await file_service.start_cloudinary_upload(file, user_id, unique_filename)
+            try:
+                statement = self.create(
+                    db,
+                    statement_data,
+                    user_id=user_id,
+                    filename=unique_filename,
+                    original_filename=file.filename,
+                    file_size=file.size,
+                    file_type=file.content_type,
+                    content_sha256=content_sha256,
+                    status=StatementStatus.UPLOADING
+                )
+            except Exception:
+                # A running upload can't be cancelled, so remove the file once it lands
+                try:
+                    public_id, _ = await upload
+                except Exception:
+                    pass
+                else:
+                    await asyncio.to_thread(file_service.delete_from_cloudinary, public_id)
+                raise
+
+            try:
+                public_id, secure_url = await upload
+            except Exception as e:
+                # Soft delete the placeholder so the same file can be uploaded again
+                statement.status = StatementStatus.FAILED
+                statement.error_message = str(e)
+                statement.is_active = False
+                db.commit()
+                raise
+
+            statement.cloudinary_public_id = public_id
+            statement.cloudinary_url = secure_url
+            statement.status = StatementStatus.UPLOADED
+            db.commit()
             
             self.log_operation(
                 "upload_statement",
@@ -95,12 +159,18 @@ class StatementService(BaseService[Statement, StatementCreate, StatementUpdate])
             if params.end_date:
                 query = query.filter(Statement.created_at <= params.end_date)
             
-            # Get total count
-            total = query.count()
-            
-            # Apply pagination
+            # Count rides along with the page rows so pagination costs one round trip
             offset = (params.page - 1) * params.size
-            statements = query.offset(offset).limit(params.size).all()
+            rows = query.add_columns(func.count().over().label("total")) \
+                .order_by(Statement.created_at.desc()) \
+                .offset(offset).limit(params.size).all()
+
+            statements = [statement for statement, _ in rows]
+            if rows:
+                total = rows[0].total
+            else:
+                # A page past the end returns no rows, so the window count is unavailable
+                total = query.count() if offset else 0
             
             self.log_operation(
                 "get_user_statements",
@@ -192,35 +262,20 @@ class StatementService(BaseService[Statement, StatementCreate, StatementUpdate])
     def get_statement_stats(self, db: Session, user_id: int) -> Dict[str, Any]:
         """Get statement statistics for user"""
         try:
-            total_statements = db.query(Statement).filter(
+            # All status counts come back from one aggregate scan
+            total_statements, completed_statements, processing_statements, failed_statements = db.query(
+                func.count(Statement.id),
+                func.count(Statement.id).filter(Statement.status == StatementStatus.COMPLETED),
+                func.count(Statement.id).filter(Statement.status == StatementStatus.PROCESSING),
+                func.count(Statement.id).filter(Statement.status == StatementStatus.FAILED)
+            ).filter(
                 Statement.user_id == user_id
-            ).count()
-            
-            completed_statements = db.query(Statement).filter(
-                and_(
-                    Statement.user_id == user_id,
-                    Statement.status == StatementStatus.COMPLETED
-                )
-            ).count()
-            
-            processing_statements = db.query(Statement).filter(
-                and_(
-                    Statement.user_id == user_id,
-                    Statement.status == StatementStatus.PROCESSING
-                )
-            ).count()
-            
-            failed_statements = db.query(Statement).filter(
-                and_(
-                    Statement.user_id == user_id,
-                    Statement.status == StatementStatus.FAILED
-                )
-            ).count()
+            ).one()
             
             # Get category distribution
             category_stats = db.query(
                 Statement.category,
-                db.func.count(Statement.id).label('count')
+                func.count(Statement.id).label('count')
             ).filter(
                 Statement.user_id == user_id
             ).group_by(Statement.category).all()
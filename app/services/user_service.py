@@ -1,6 +1,7 @@
 """User service for user management operations"""
 
 from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
@@ -18,7 +19,8 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
     def get_by_email(self, db: Session, email: str) -> Optional[User]:
         """Get user by email"""
         try:
-            return db.query(User).filter(User.email == email).first()
+            # Email is unique, so no LIMIT is needed to fetch at most one row
+            return db.execute(select(User).where(User.email == email)).scalar_one_or_none()
         except Exception as e:
             self.log_error(e, "get_by_email", email=email)
             raise
@@ -37,12 +39,12 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
             # Create user
             user_data = user_in.model_dump(exclude={'password', 'confirm_password'})
             user_data['hashed_password'] = hashed_password
-            print(user_data.values())
 
             user = User(**user_data)
             db.add(user)
+            # Column defaults are set client-side and the id comes back via RETURNING,
+            # and sessions keep loaded values after commit, so no refresh is needed
             db.commit()
-            db.refresh(user)
 
             self.log_operation("create_user", user_id=user.id, email=user.email)
             return user
@@ -58,6 +60,9 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         try:
             user = self.get_by_email(db, email)
             if not user:
+                # An unknown email takes as long as a wrong password, so timing
+                # does not reveal which accounts exist
+                security_service.dummy_verify_password()
                 return None
             
             if not security_service.verify_password(password, user.hashed_password):
@@ -76,8 +81,9 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
             from datetime import datetime
             user.last_login = datetime.utcnow()
             db.add(user)
+            # The flush writes the new timestamp, and sessions keep it after commit,
+            # so re-reading the row would only return what was just written
             db.commit()
-            db.refresh(user)
             return user
         except Exception as e:
             self.log_error(e, "update_last_login", user_id=user.id)
@@ -124,7 +130,6 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
             user.subscription_tier = SubscriptionTier(subscription_tier)
             db.add(user)
             db.commit()
-            db.refresh(user)
             
             self.log_operation(
                 "update_subscription", 
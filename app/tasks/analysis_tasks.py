@@ -1,15 +1,31 @@
 """Celery tasks for financial analysis processing"""
 import asyncio
+import threading
 
-from celery import current_task
-from sqlalchemy.orm import Session
+from celery import current_task, group
+from celery.exceptions import Retry
 from app.tasks.celery_app import celery_app
-from app.core.database import SessionLocal
+from app.core.database import task_session
 from app.services.analysis_service import analysis_service
 from app.core.logging import get_logger
+from app.core.exceptions import ServiceUnavailableError
 
 logger = get_logger(__name__)
 
+# One event loop per worker thread, reused by every task the thread runs; the
+# I/O-bound queues run on the threads pool, where a shared loop cannot be re-entered
+_local = threading.local()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return this worker thread's event loop, creating it on first use"""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _local.loop = loop
+    return loop
+
 
 @celery_app.task(bind=True, name="process_statement_analysis")
 def process_statement_analysis(
@@ -26,144 +42,140 @@ def process_statement_analysis(
         meta={"current": 0, "total": 100, "status": "Starting analysis..."}
     )
 
-    db: Session = SessionLocal()
     analysis = None
 
-    try:
-        logger.info(
-            "Starting analysis task",
-            task_id=self.request.id,
-            statement_id=statement_id,
-            user_id=user_id
-        )
-
-        self.update_state(
-            state="PROGRESS",
-            meta={"current": 20, "total": 100, "status": "Downloading file..."}
-        )
-
-
+    with task_session() as db:
         try:
+            logger.info(
+                "Starting analysis task",
+                task_id=self.request.id,
+                statement_id=statement_id,
+                user_id=user_id
+            )
 
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            analysis = loop.run_until_complete(
-                analysis_service.create_analysis(
-                    db, statement_id, user_id, analysis_type
-                )
+            self.update_state(
+                state="PROGRESS",
+                meta={"current": 20, "total": 100, "status": "Downloading file..."}
             )
 
-        except Exception as async_error:
-            logger.error(f"Async analysis creation failed: {str(async_error)}")
 
+            try:
 
-        if not analysis:
-            logger.error("No analysis object could be created.")
-            raise ValueError("Analysis is None.")
+                analysis = _get_loop().run_until_complete(
+                    analysis_service.create_analysis(
+                        db, statement_id, user_id, analysis_type
+                    )
+                )
 
+            except ServiceUnavailableError as e:
+                # Statement is back in UPLOADED; try again once the circuit has reset
+                raise self.retry(exc=e, countdown=e.details.get("retry_after", 30))
+            except Exception as async_error:
+                logger.error(f"Async analysis creation failed: {str(async_error)}")
 
-        self.update_state(
-            state="PROGRESS",
-            meta={"current": 50, "total": 100, "status": "Processing with AI..."}
-        )
 
+            if not analysis:
+                logger.error("No analysis object could be created.")
+                raise ValueError("Analysis is None.")
 
-        self.update_state(
-            state="PROGRESS",
-            meta={"current": 90, "total": 100, "status": "Finalizing results..."}
-        )
 
-        if analysis:
-            logger.info(
-                "Analysis task completed",
-                task_id=self.request.id,
-                analysis_id=analysis.id,
-                statement_id=statement_id
+            self.update_state(
+                state="PROGRESS",
+                meta={"current": 50, "total": 100, "status": "Processing with AI..."}
             )
 
-            return {
-                "status": "completed",
-                "analysis_id": analysis.id,
-                "statement_id": statement_id,
-                "financial_health_score": analysis.financial_health_score,
-                "processing_time": analysis.processing_time_seconds
-            }
 
-        else:
-            logger.warning(
-                "Analysis task completed, but analysis object is None.",
-                task_id=self.request.id,
-                statement_id=statement_id
+            self.update_state(
+                state="PROGRESS",
+                meta={"current": 90, "total": 100, "status": "Finalizing results..."}
             )
 
+            if analysis:
+                logger.info(
+                    "Analysis task completed",
+                    task_id=self.request.id,
+                    analysis_id=analysis.id,
+                    statement_id=statement_id
+                )
+
+                return {
+                    "status": "completed",
+                    "analysis_id": analysis.id,
+                    "statement_id": statement_id,
+                    "financial_health_score": analysis.financial_health_score,
+                    "processing_time": analysis.processing_time_seconds
+                }
 
+            else:
+                logger.warning(
+                    "Analysis task completed, but analysis object is None.",
+                    task_id=self.request.id,
+                    statement_id=statement_id
+                )
 
-    except Exception as e:
-        logger.error(
-            "Analysis task failed",
-            task_id=self.request.id,
-            statement_id=statement_id,
-            error=str(e)
-        )
 
-        try:
-            from app.services.statement_service import statement_service
-            from app.models.statement import StatementStatus
-            statement_service.update_processing_status(
-                db, statement_id, StatementStatus.FAILED, str(e)
+
+        except Retry:
+            raise
+        except Exception as e:
+            logger.error(
+                "Analysis task failed",
+                task_id=self.request.id,
+                statement_id=statement_id,
+                error=str(e)
             )
-        except:
-            pass
 
-        self.update_state(
-            state="FAILURE",
-            meta={"error": str(e), "statement_id": statement_id}
-        )
+            try:
+                from app.services.statement_service import statement_service
+                from app.models.statement import StatementStatus
+                # Clear any failed transaction so the status update can run
+                db.rollback()
+                statement_service.update_processing_status(
+                    db, statement_id, StatementStatus.FAILED, str(e)
+                )
+            except:
+                pass
 
-        raise
+            self.update_state(
+                state="FAILURE",
+                meta={"error": str(e), "statement_id": statement_id}
+            )
 
-    finally:
-        db.close()
+            raise
 
 
 @celery_app.task(name="batch_process_statements")
 def batch_process_statements(statement_ids: list, user_id: int):
     """Process multiple statements in batch"""
     
-    results = []
     total = len(statement_ids)
-    
-    for i, statement_id in enumerate(statement_ids):
-        try:
 
-            result = process_statement_analysis.delay(statement_id, user_id)
-            results.append({
-                "statement_id": statement_id,
-                "task_id": result.id,
-                "status": "queued"
-            })
-            
+    # One group publishes every task over a single producer connection
+    group_result = group(
+        process_statement_analysis.s(statement_id, user_id) for statement_id in statement_ids
+    ).apply_async()
 
-            current_task.update_state(
-                state="PROGRESS",
-                meta={
-                    "current": i + 1,
-                    "total": total,
-                    "status": f"Queued {i + 1}/{total} statements"
-                }
-            )
-            
-        except Exception as e:
-            results.append({
-                "statement_id": statement_id,
-                "error": str(e),
-                "status": "failed"
-            })
+    results = [
+        {
+            "statement_id": statement_id,
+            "task_id": result.id,
+            "status": "queued"
+        }
+        for statement_id, result in zip(statement_ids, group_result.children)
+    ]
 
+    current_task.update_state(
+        state="PROGRESS",
+        meta={
+            "current": total,
+            "total": total,
+            "status": f"Queued {total}/{total} statements"
+        }
+    )
     
     return {
         "status": "completed",
+        "group_id": group_result.id,
         "total_statements": total,
         "results": results
     }
@@ -173,41 +185,36 @@ def batch_process_statements(statement_ids: list, user_id: int):
 def cleanup_failed_analyses():
     """Cleanup failed analysis records and update statement statuses"""
     
-    db: Session = SessionLocal()
-    
-    try:
-        from app.models.statement import Statement, StatementStatus
-        from datetime import datetime, timedelta
-        
-        # Find statements stuck in processing for more than 1 hour
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
+    with task_session() as db:
+        try:
+            from app.models.statement import Statement, StatementStatus
+            from datetime import datetime, timedelta
         
-        stuck_statements = db.query(Statement).filter(
-            Statement.status == StatementStatus.PROCESSING,
-            Statement.processing_started_at < one_hour_ago
-        ).all()
+            # Find statements stuck in processing for more than 1 hour
+            one_hour_ago = datetime.utcnow() - timedelta(hours=1)
         
-        cleanup_count = 0
-        for statement in stuck_statements:
-            statement.status = StatementStatus.FAILED
-            statement.error_message = "Processing timeout - task may have failed"
-            db.add(statement)
-            cleanup_count += 1
+            # One UPDATE marks them all failed instead of loading and flushing each row
+            cleanup_count = db.query(Statement).filter(
+                Statement.status == StatementStatus.PROCESSING,
+                Statement.processing_started_at < one_hour_ago
+            ).update(
+                {
+                    "status": StatementStatus.FAILED,
+                    "error_message": "Processing timeout - task may have failed"
+                },
+                synchronize_session=False
+            )
         
-        db.commit()
+            db.commit()
         
-        logger.info(f"Cleaned up {cleanup_count} stuck statements")
+            logger.info(f"Cleaned up {cleanup_count} stuck statements")
         
-        return {
-            "status": "completed",
-            "cleaned_up_count": cleanup_count
-        }
+            return {
+                "status": "completed",
+                "cleaned_up_count": cleanup_count
+            }
         
-    except Exception as e:
-        logger.error(f"Cleanup task failed: {str(e)}")
-
-        db.rollback()
-        raise
+        except Exception as e:
+            logger.error(f"Cleanup task failed: {str(e)}")
+            raise
         
-    finally:
-        db.close()
\ No newline at end of file
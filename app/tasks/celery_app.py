@@ -1,6 +1,7 @@
 """Celery application configuration"""
 
 from celery import Celery
+from celery.schedules import crontab
 from app.core.config import settings
 
 
@@ -29,10 +30,28 @@ celery_app.conf.update(
     worker_max_tasks_per_child=1000,
 )
 
-# Task routing
+# Task routing; tasks are registered under short names, so routes match those
+# rather than module paths. Anything unrouted goes to the default "celery" queue
 celery_app.conf.task_routes = {
-    "app.tasks.analysis_tasks.*": {"queue": "analysis"},
-    "app.tasks.file_tasks.*": {"queue": "files"},
-    "app.tasks.notification_tasks.*": {"queue": "notifications"},
-    "app.tasks.export_tasks.*": {"queue": "exports"},
-}
\ No newline at end of file
+    "process_statement_analysis": {"queue": "analysis"},
+    "batch_process_statements": {"queue": "analysis"},
+    "cleanup_failed_analyses": {"queue": "analysis"},
+    "cleanup_orphaned_files": {"queue": "files"},
+    "validate_file_integrity": {"queue": "files"},
+    "send_analysis_complete_notification": {"queue": "notifications"},
+    "send_anomaly_alert": {"queue": "notifications"},
+    "send_weekly_summary": {"queue": "notifications"},
+    "send_weekly_summaries_all": {"queue": "notifications"},
+    "send_weekly_summary_email": {"queue": "notifications"},
+    "process_bulk_export": {"queue": "exports"},
+    "schedule_periodic_exports": {"queue": "exports"},
+    "cleanup_export_files": {"queue": "exports"},
+}
+
+# Periodic tasks, run by the celery beat service
+celery_app.conf.beat_schedule = {
+    "send-weekly-summaries": {
+        "task": "send_weekly_summaries_all",
+        "schedule": crontab(hour=8, minute=0, day_of_week="mon"),
+    },
+}
@@ -1,5 +1,9 @@
 """Celery tasks for file processing operations"""
 
+import asyncio
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import httpx
 from celery import current_task
 from app.tasks.celery_app import celery_app
 from app.services.file_service import file_service
@@ -7,46 +11,47 @@ from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Concurrent HEAD requests while checking stored files
+INTEGRITY_CHECK_CONCURRENCY = 50
+INTEGRITY_CHECK_FETCH_SIZE = 50
+
 
 @celery_app.task(name="cleanup_orphaned_files")
 def cleanup_orphaned_files():
     """Clean up orphaned files from cloud storage"""
     
     try:
-        from sqlalchemy.orm import Session
-        from app.core.database import SessionLocal
+        from app.core.database import task_session
         from app.models.statement import Statement, StatementStatus
         from datetime import datetime, timedelta
         
-        db: Session = SessionLocal()
-        
-        # Find statements marked for deletion or failed more than 24 hours ago
-        cleanup_threshold = datetime.utcnow() - timedelta(hours=24)
-        
-        statements_to_cleanup = db.query(Statement).filter(
-            Statement.status.in_([StatementStatus.DELETED, StatementStatus.FAILED]),
-            Statement.updated_at < cleanup_threshold,
-            Statement.cloudinary_public_id.isnot(None)
-        ).all()
-        
-        cleanup_count = 0
-        for statement in statements_to_cleanup:
-            try:
-                # Delete from Cloudinary
-                if file_service.delete_from_cloudinary(statement.cloudinary_public_id):
-                    # Clear Cloudinary references
-                    statement.cloudinary_public_id = None
-                    statement.cloudinary_url = None
-                    db.add(statement)
-                    cleanup_count += 1
+        with task_session() as db:
+            # Find statements marked for deletion or failed more than 24 hours ago
+            cleanup_threshold = datetime.utcnow() - timedelta(hours=24)
+        
+            statements_to_cleanup = db.query(Statement).filter(
+                Statement.status.in_([StatementStatus.DELETED, StatementStatus.FAILED]),
+                Statement.updated_at < cleanup_threshold,
+                Statement.cloudinary_public_id.isnot(None)
+            ).all()
+        
+            cleanup_count = 0
+            for statement in statements_to_cleanup:
+                try:
+                    # Delete from Cloudinary
+                    if file_service.delete_from_cloudinary(statement.cloudinary_public_id):
+                        # Clear Cloudinary references
+                        statement.cloudinary_public_id = None
+                        statement.cloudinary_url = None
+                        db.add(statement)
+                        cleanup_count += 1
                     
-            except Exception as e:
-                logger.error(
-                    f"Failed to cleanup file for statement {statement.id}: {str(e)}"
-                )
+                except Exception as e:
+                    logger.error(
+                        f"Failed to cleanup file for statement {statement.id}: {str(e)}"
+                    )
         
-        db.commit()
-        db.close()
+            db.commit()
         
         logger.info(f"Cleaned up {cleanup_count} orphaned files")
         
@@ -60,23 +65,68 @@ def cleanup_orphaned_files():
         raise
 
 
+async def _head_file(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    statement_id: int,
+    url: str
+) -> Tuple[int, Optional[str]]:
+    """HEAD one stored file, returning its statement ID and an error or None"""
+    async with semaphore:
+        try:
+            response = await client.head(url)
+        except Exception as e:
+            return statement_id, str(e)
+    if response.status_code == 200:
+        return statement_id, None
+    return statement_id, f"HTTP {response.status_code}"
+
+
+async def _check_files(files: Iterable[Tuple[int, str]], validation_results: Dict[str, Any]) -> None:
+    """Check stored files concurrently as they stream in, reporting progress as each one finishes"""
+    semaphore = asyncio.Semaphore(INTEGRITY_CHECK_CONCURRENCY)
+    limits = httpx.Limits(max_connections=INTEGRITY_CHECK_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=10, limits=limits) as client:
+        checks = []
+        for statement_id, url in files:
+            checks.append(asyncio.create_task(_head_file(client, semaphore, statement_id, url)))
+            # Let this HEAD go out before the next row is read from the cursor
+            await asyncio.sleep(0)
+
+        for check in asyncio.as_completed(checks):
+            statement_id, error = await check
+
+            if error is None:
+                validation_results["valid_files"] += 1
+            else:
+                validation_results["invalid_files"] += 1
+                validation_results["errors"].append({
+                    "statement_id": statement_id,
+                    "error": error
+                })
+
+            validation_results["total_checked"] += 1
+
+            # Update task progress
+            current_task.update_state(
+                state="PROGRESS",
+                meta={
+                    "current": validation_results["total_checked"],
+                    "total": len(checks),
+                    "valid": validation_results["valid_files"],
+                    "invalid": validation_results["invalid_files"]
+                }
+            )
+
+
 @celery_app.task(name="validate_file_integrity")
 def validate_file_integrity():
     """Validate integrity of stored files"""
     
     try:
-        from sqlalchemy.orm import Session
-        from app.core.database import SessionLocal
+        from sqlalchemy import select
+        from app.core.database import task_session
         from app.models.statement import Statement, StatementStatus
-        import httpx
-        
-        db: Session = SessionLocal()
-        
-        # Get active statements with Cloudinary URLs
-        statements = db.query(Statement).filter(
-            Statement.status.in_([StatementStatus.UPLOADED, StatementStatus.COMPLETED]),
-            Statement.cloudinary_url.isnot(None)
-        ).limit(100).all()  # Process in batches
         
         validation_results = {
             "total_checked": 0,
@@ -85,42 +135,18 @@ def validate_file_integrity():
             "errors": []
         }
         
-        for statement in statements:
-            try:
-                # Check if file exists and is accessible
-                response = httpx.head(statement.cloudinary_url, timeout=10)
-                
-                if response.status_code == 200:
-                    validation_results["valid_files"] += 1
-                else:
-                    validation_results["invalid_files"] += 1
-                    validation_results["errors"].append({
-                        "statement_id": statement.id,
-                        "error": f"HTTP {response.status_code}"
-                    })
-                
-                validation_results["total_checked"] += 1
-                
-                # Update task progress
-                current_task.update_state(
-                    state="PROGRESS",
-                    meta={
-                        "current": validation_results["total_checked"],
-                        "total": len(statements),
-                        "valid": validation_results["valid_files"],
-                        "invalid": validation_results["invalid_files"]
-                    }
-                )
-                
-            except Exception as e:
-                validation_results["invalid_files"] += 1
-                validation_results["total_checked"] += 1
-                validation_results["errors"].append({
-                    "statement_id": statement.id,
-                    "error": str(e)
-                })
-        
-        db.close()
+        with task_session() as db:
+            # Get active statements with Cloudinary URLs, streamed from a server-side
+            # cursor so checks start on the first rows rather than after the whole fetch
+            files = db.execute(
+                select(Statement.id, Statement.cloudinary_url).where(
+                    Statement.status.in_([StatementStatus.UPLOADED, StatementStatus.COMPLETED]),
+                    Statement.cloudinary_url.isnot(None)
+                ).limit(100).execution_options(yield_per=INTEGRITY_CHECK_FETCH_SIZE)  # Process in batches
+            )
+            
+            # The HEAD requests all wait on the network, so they run concurrently
+            asyncio.run(_check_files(files, validation_results))
         
         logger.info(
             f"File integrity validation completed: "
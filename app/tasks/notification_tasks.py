@@ -47,16 +47,24 @@ def send_anomaly_alert(user_id: int, anomalies: list):
     """Send alert for detected financial anomalies"""
     
     try:
-        high_severity_anomalies = [
-            a for a in anomalies 
+        if not anomalies:
+            return {
+                "status": "sent",
+                "user_id": user_id,
+                "anomaly_count": 0,
+                "high_severity_count": 0
+            }
+        
+        high_severity_count = sum(
+            1 for a in anomalies 
             if a.get("severity") == "high"
-        ]
+        )
         
-        if high_severity_anomalies:
+        if high_severity_count:
             logger.info(
                 "High severity anomaly alert",
                 user_id=user_id,
-                anomaly_count=len(high_severity_anomalies)
+                anomaly_count=high_severity_count
             )
             
             # Send urgent notification for high-severity anomalies
@@ -66,7 +74,7 @@ def send_anomaly_alert(user_id: int, anomalies: list):
             "status": "sent",
             "user_id": user_id,
             "anomaly_count": len(anomalies),
-            "high_severity_count": len(high_severity_anomalies)
+            "high_severity_count": high_severity_count
         }
         
     except Exception as e:
@@ -79,55 +87,132 @@ def send_weekly_summary(user_id: int):
     """Send weekly financial summary to user"""
     
     try:
-        from sqlalchemy.orm import Session
-        from app.core.database import SessionLocal
+        from app.core.database import task_session
+        from sqlalchemy import func
         from app.models.analysis import Analysis
         from datetime import datetime, timedelta
         
-        db: Session = SessionLocal()
-        
-        # Get analyses from the last week
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_analyses = db.query(Analysis).filter(
-            Analysis.user_id == user_id,
-            Analysis.created_at >= week_ago
-        ).all()
+        with task_session() as db:
+            # Summarise the last week's analyses in one aggregate instead of loading the rows
+            week_ago = datetime.utcnow() - timedelta(days=7)
+            analyses_count, avg_health_score, total_income, total_expenses = db.query(
+                func.count(Analysis.id),
+                func.avg(func.coalesce(Analysis.financial_health_score, 0)),
+                func.coalesce(func.sum(Analysis.total_income), 0),
+                func.coalesce(func.sum(Analysis.total_expenses), 0)
+            ).filter(
+                Analysis.user_id == user_id,
+                Analysis.created_at >= week_ago
+            ).one()
         
-        if recent_analyses:
-            # Calculate summary statistics
-            avg_health_score = sum(
-                a.financial_health_score or 0 for a in recent_analyses
-            ) / len(recent_analyses)
+            if analyses_count:
+                summary = {
+                    "period": "last_week",
+                    "analyses_count": analyses_count,
+                    "avg_health_score": round(float(avg_health_score), 1),
+                    "total_income": total_income,
+                    "total_expenses": total_expenses,
+                    "net_cash_flow": total_income - total_expenses
+                }
             
-            total_income = sum(a.total_income or 0 for a in recent_analyses)
-            total_expenses = sum(a.total_expenses or 0 for a in recent_analyses)
+                logger.info(
+                    "Weekly summary generated",
+                    user_id=user_id,
+                    summary=summary
+                )
             
-            summary = {
+                # Send summary via email/notification
+                # Implementation would depend on notification service
+        
+        return {
+            "status": "sent",
+            "user_id": user_id,
+            "analyses_included": analyses_count
+        }
+        
+    except Exception as e:
+        logger.error(f"Failed to send weekly summary: {str(e)}")
+        raise
+
+
+@celery_app.task(name="send_weekly_summaries_all")
+def send_weekly_summaries_all():
+    """Build every active user's weekly summary in one query and fan out the sends"""
+    
+    try:
+        from app.core.database import task_session
+        from celery import group
+        from sqlalchemy import func
+        from app.models.analysis import Analysis
+        from app.models.user import User
+        from datetime import datetime, timedelta
+        
+        with task_session() as db:
+            # One GROUP BY for all users instead of a session and aggregate per user
+            week_ago = datetime.utcnow() - timedelta(days=7)
+            rows = db.query(
+                Analysis.user_id,
+                func.count(Analysis.id),
+                func.avg(func.coalesce(Analysis.financial_health_score, 0)),
+                func.coalesce(func.sum(Analysis.total_income), 0),
+                func.coalesce(func.sum(Analysis.total_expenses), 0)
+            ).join(
+                User, User.id == Analysis.user_id
+            ).filter(
+                User.is_active.is_(True),
+                Analysis.created_at >= week_ago
+            ).group_by(Analysis.user_id).all()
+        
+        summaries = [
+            (user_id, {
                 "period": "last_week",
-                "analyses_count": len(recent_analyses),
-                "avg_health_score": round(avg_health_score, 1),
+                "analyses_count": analyses_count,
+                "avg_health_score": round(float(avg_health_score), 1),
                 "total_income": total_income,
                 "total_expenses": total_expenses,
                 "net_cash_flow": total_income - total_expenses
-            }
-            
-            logger.info(
-                "Weekly summary generated",
-                user_id=user_id,
-                summary=summary
-            )
-            
-            # Send summary via email/notification
-            # Implementation would depend on notification service
+            })
+            for user_id, analyses_count, avg_health_score, total_income, total_expenses in rows
+        ]
+        
+        if summaries:
+            group(
+                send_weekly_summary_email.s(user_id, summary)
+                for user_id, summary in summaries
+            ).apply_async()
         
-        db.close()
+        logger.info("Weekly summaries dispatched", user_count=len(summaries))
+        
+        return {
+            "status": "dispatched",
+            "user_count": len(summaries)
+        }
+        
+    except Exception as e:
+        logger.error(f"Failed to dispatch weekly summaries: {str(e)}")
+        raise
+
+
+@celery_app.task(name="send_weekly_summary_email")
+def send_weekly_summary_email(user_id: int, summary: dict):
+    """Send a precomputed weekly summary to user"""
+    
+    try:
+        logger.info(
+            "Weekly summary generated",
+            user_id=user_id,
+            summary=summary
+        )
+        
+        # Send summary via email/notification
+        # Implementation would depend on notification service
         
         return {
             "status": "sent",
             "user_id": user_id,
-            "analyses_included": len(recent_analyses) if recent_analyses else 0
+            "analyses_included": summary["analyses_count"]
         }
         
     except Exception as e:
         logger.error(f"Failed to send weekly summary: {str(e)}")
-        raise
\ No newline at end of file
+        raise
@@ -1,91 +1,127 @@
 """Main FastAPI application"""
 
-import time
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, HTTPException
+import orjson
+from fastapi import FastAPI, Request, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
-import sentry_sdk
-from sentry_sdk.integrations.fastapi import FastApiIntegration
-from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+from fastapi.responses import ORJSONResponse
 
 from app.core.config import settings
+from app.core.database import engine, warm_pool
 from app.core.logging import configure_logging, get_logger
 from app.core.exceptions import IntelliBaseException
+from app.core.middleware import ObservabilityMiddleware, StaticRouteMiddleware
 from app.api.v1.api import api_router
 
 # Configure logging
 configure_logging()
 logger = get_logger(__name__)
 
+# Constant response bodies, serialized once since settings don't change at runtime
+_ROOT_BYTES = orjson.dumps({
+    "message": "IntelliBank API",
+    "version": settings.APP_VERSION,
+    "docs": "/docs" if settings.DEBUG else "Documentation not available in production",
+    "health": "/api/v1/health"
+})
+_INTERNAL_ERROR_BYTES = orjson.dumps({
+    "error": "Internal server error",
+    "message": "An unexpected error occurred"
+})
+
+
+def setup_sentry() -> None:
+    """Initialise Sentry error reporting when a DSN is configured"""
+    if not settings.SENTRY_DSN:
+        return
+    
+    # Imported here so workers without a DSN never load the SDK
+    import sentry_sdk
+    from sentry_sdk.integrations.fastapi import FastApiIntegration
+    from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+    
+    sentry_sdk.init(
+        dsn=settings.SENTRY_DSN,
+        release=settings.APP_VERSION,
+        integrations=[FastApiIntegration(), SqlalchemyIntegration()]
+    )
 
 
+# Sentry patches FastAPI and SQLAlchemy, so it starts before the app is built
+setup_sentry()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm a few database connections before serving and release the pool on shutdown"""
+    try:
+        await asyncio.to_thread(warm_pool)
+    except Exception as e:
+        # The app still starts; requests connect on demand once the database is back
+        logger.warning("Database pool warm-up failed", error=str(e))
+    
+    yield
+    
+    engine.dispose()
 
 
 # Create FastAPI application
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Advanced Bank Statement Intelligence Platform",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=ORJSONResponse,
 )
 
-# Add CORS middleware
+# Constant routes are answered here, inside the host and CORS checks but before routing
+app.add_middleware(StaticRouteMiddleware, routes={"/": _ROOT_BYTES})
+
+# Add CORS middleware; methods and headers are the ones the API uses, and browsers
+# cache the preflight answer for a day
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
+    allow_origins=tuple(settings.BACKEND_CORS_ORIGINS),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=("GET", "POST", "PUT", "DELETE"),
+    allow_headers=("authorization", "content-type"),
+    max_age=86400,
 )
 
-# Add trusted host middleware
+# Add trusted host middleware; with DEBUG every host was allowed, so skip the check
+if not settings.DEBUG:
+    app.add_middleware(
+        TrustedHostMiddleware,
+        allowed_hosts=["localhost", "127.0.0.1", *settings.EXTRA_HOSTS]
+    )
+
+# Add request timing and logging middleware
 app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=["*"] if settings.DEBUG else ["localhost", "127.0.0.1"]
+    ObservabilityMiddleware,
+    max_concurrency=settings.MAX_CONCURRENCY,
+    emit_timing_header=settings.EMIT_TIMING_HEADER
 )
 
 
-# Request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    """Add processing time header to responses"""
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
-
-
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log all requests"""
-    start_time = time.time()
-    
-    # Log request
-    logger.info(
-        "Request started",
-        method=request.method,
-        url=str(request.url),
-        client_ip=request.client.host if request.client else None
-    )
-    
-    response = await call_next(request)
-    
-    # Log response
-    process_time = time.time() - start_time
-    logger.info(
-        "Request completed",
-        method=request.method,
-        url=str(request.url),
-        status_code=response.status_code,
-        process_time=process_time
-    )
-    
-    return response
+def _log_ctx(request: Request, full_url: bool = False) -> dict:
+    """Request fields shared by the exception handler log calls"""
+    # The scope path is already a str; the full URL is only built where the
+    # query string helps diagnose the error
+    scope = request.scope
+    client = scope.get("client")
+    ctx = {
+        "method": scope["method"],
+        "client_ip": client[0] if client else None
+    }
+    if full_url:
+        ctx["url"] = str(request.url)
+    else:
+        ctx["url_path"] = scope["path"]
+    return ctx
 
 
 # Global exception handler
@@ -96,10 +132,10 @@ async def intellibank_exception_handler(request: Request, exc: IntelliBaseExcept
         "IntelliBank exception",
         error=exc.message,
         details=exc.details,
-        url=str(request.url)
+        **_log_ctx(request, full_url=True)
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=400,
         content={
             "error": exc.message,
@@ -116,10 +152,10 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         "HTTP exception",
         status_code=exc.status_code,
         detail=exc.detail,
-        url=str(request.url)
+        **_log_ctx(request)
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail}
     )
@@ -132,15 +168,13 @@ async def general_exception_handler(request: Request, exc: Exception):
         "Unexpected exception",
         error=str(exc),
         error_type=type(exc).__name__,
-        url=str(request.url)
+        **_log_ctx(request)
     )
     
-    return JSONResponse(
+    return Response(
+        content=_INTERNAL_ERROR_BYTES,
         status_code=500,
-        content={
-            "error": "Internal server error",
-            "message": "An unexpected error occurred"
-        }
+        media_type="application/json"
     )
 
 
@@ -151,21 +185,28 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": "IntelliBank API",
-        "version": settings.APP_VERSION,
-        "docs": "/docs" if settings.DEBUG else "Documentation not available in production",
-        "health": "/api/v1/health"
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
+    from app.core.security import pwd_context, tune_password_hash_rounds
+    
+    if not settings.PASSWORD_HASH_ROUNDS:
+        # Benchmark bcrypt once here; spawned workers pick the result up from the environment
+        rounds = tune_password_hash_rounds()
+        os.environ["PASSWORD_HASH_ROUNDS"] = str(rounds)
+        pwd_context.update(bcrypt__rounds=rounds)
+        logger.info("Password hash cost tuned", rounds=rounds)
     
     uvicorn.run(
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
+        loop="uvloop",
+        http="httptools",
+        workers=1 if settings.DEBUG else settings.WORKERS,
         reload=settings.DEBUG,
         log_level="debug" if settings.DEBUG else "info"
     )
\ No newline at end of file